@@ -0,0 +1,76 @@
+"""
+Startup benchmark – Cold-Start-Kosten des Cloud Run Service.
+
+Startet einen frischen Interpreter mit `python -X importtime`, importiert
+`main` und beantwortet einen /health-Request über den Flask Test-Client.
+Berichtet die Zeit bis zur ersten /health-Antwort, die teuersten Imports
+und ob ein schweres SDK (BigQuery, Supabase) schon beim Start geladen wurde.
+
+Run with: python benchmarks/startup.py [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+HEAVY_MODULES = ("google.cloud.bigquery", "supabase")
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+import main
+response = main.app.test_client().get("/health")
+elapsed_ms = (time.perf_counter() - t0) * 1000
+assert response.status_code == 200, response.status_code
+print(f"HEALTH_MS={elapsed_ms:.1f}")
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, str]]:
+    """Return (cumulative µs, module) for every line of an -X importtime report."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), name.strip()))
+    return entries
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--top", type=int, default=15, help="Anzahl der teuersten Imports")
+    args = arg_parser.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": SRC_DIR}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+        return proc.returncode
+
+    health_ms = next(
+        float(line.split("=", 1)[1]) for line in proc.stdout.splitlines() if line.startswith("HEALTH_MS=")
+    )
+    entries = parse_importtime(proc.stderr)
+    imported = {name for _, name in entries}
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+
+    print(f"/health nach {health_ms:.1f} ms")
+    print(f"Top {args.top} Imports (kumulativ):")
+    for cumulative, name in sorted(entries, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if heavy:
+        print(f"FEHLER: schwere SDKs beim Start importiert: {', '.join(heavy)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Aggregates – Creative Dashboard ETL
+
+Lese-API für Dashboard-Aggregate über creative_metrics × parsed_ad_dimensions.
+
+Nach jedem erfolgreichen Sync wird ein spaltenorientierter Snapshot beider
+Tabellen im Speicher aufgebaut (ein Join, einmal pro Sync). Gruppierungen
+werden darauf berechnet und pro Snapshot in einem LRU-Cache gehalten; ein
+neuer Snapshot ersetzt den alten samt Cache.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Optional
+
+from supabase_client import (
+    OPTIONAL_DIMENSION_FIELDS,
+    load_stored_dimensions,
+    load_stored_creative_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 128
+
+GROUPABLE_COLUMNS = [
+    "company", "channels",
+    "schema_version", "product", "creative_id", "content_type", "adtype",
+    "creative_cluster", "in_ex", "creative_source", "is_ai",
+    *(f for f in OPTIONAL_DIMENSION_FIELDS if f != "raw_suffix"),
+]
+
+
+class Snapshot:
+    """Column-oriented join of metrics and dimensions with an LRU of computed groupings."""
+
+    def __init__(self, columns: dict[str, list], built_at: str = None):
+        self.columns = columns
+        self.size = len(columns["ad_name_raw"])
+        self.built_at = built_at or datetime.now(timezone.utc).isoformat()
+        self._cache: OrderedDict[tuple[str, ...], list[dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, dimensions: dict, metrics: list[dict]) -> "Snapshot":
+        """
+        Build from dimension rows keyed by (ad_name_raw,) and metric rows.
+        Metrics without a dimension row are dropped (inner join).
+        """
+        names = ["ad_name_raw", "spend", "revenue", *GROUPABLE_COLUMNS]
+        columns = {name: [] for name in names}
+        for m in metrics:
+            d = dimensions.get((m["ad_name_raw"],))
+            if d is None:
+                continue
+            for name in names:
+                columns[name].append(m[name] if name in m else d.get(name))
+        return cls(columns)
+
+    def aggregate(self, group_by: tuple[str, ...]) -> list[dict]:
+        """spend, revenue, roas and creative count per group, sorted by spend."""
+        with self._cache_lock:
+            if group_by in self._cache:
+                self._cache.move_to_end(group_by)
+                return self._cache[group_by]
+
+        result = self._compute(group_by)
+
+        with self._cache_lock:
+            self._cache[group_by] = result
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, group_by: tuple[str, ...]) -> list[dict]:
+        cols = [self.columns[c] for c in group_by]
+        keys = zip(*cols) if cols else repeat((), self.size)
+
+        groups: dict[tuple, list] = {}
+        for key, name, spend, revenue in zip(
+            keys, self.columns["ad_name_raw"], self.columns["spend"], self.columns["revenue"]
+        ):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0.0, 0.0, set()]
+            group[0] += float(spend or 0)
+            group[1] += float(revenue or 0)
+            group[2].add(name)
+
+        rows = []
+        for key, (spend, revenue, creatives) in groups.items():
+            row = dict(zip(group_by, key))
+            row.update({
+                "spend":     round(spend, 2),
+                "revenue":   round(revenue, 2),
+                "roas":      round(revenue / spend, 4) if spend else None,
+                "creatives": len(creatives),
+            })
+            rows.append(row)
+        rows.sort(key=lambda r: r["spend"], reverse=True)
+        return rows
+
+
+_snapshot: Optional[Snapshot] = None
+_snapshot_lock = threading.Lock()
+# Serialisiert den Aufbau: gleichzeitige Cold-Start-Requests laden die Tabellen nur einmal
+_build_lock = threading.Lock()
+
+
+def _build_snapshot() -> Snapshot:
+    global _snapshot
+    snapshot = Snapshot.from_rows(load_stored_dimensions(), list(load_stored_creative_metrics().values()))
+    with _snapshot_lock:
+        _snapshot = snapshot
+    logger.info(f"Aggregat-Snapshot aufgebaut: {snapshot.size} Metrik-Zeilen")
+    return snapshot
+
+
+def refresh_snapshot() -> Snapshot:
+    """Rebuild the snapshot from Supabase and replace the current one (and its cache)."""
+    with _build_lock:
+        return _build_snapshot()
+
+
+def get_snapshot() -> Snapshot:
+    """Current snapshot; built once on first use (e.g. after a cold start), even for concurrent callers."""
+    with _snapshot_lock:
+        snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+    with _build_lock:
+        with _snapshot_lock:
+            snapshot = _snapshot
+        return snapshot if snapshot is not None else _build_snapshot()
+
+
+def parse_group_by(value: str) -> tuple[str, ...]:
+    """Parse `product,hook` into a column tuple; raises ValueError for unknown columns."""
+    group_by = tuple(c.strip() for c in (value or "").split(",") if c.strip())
+    unknown = [c for c in group_by if c not in GROUPABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown group_by column(s): {', '.join(unknown)}")
+    return group_by
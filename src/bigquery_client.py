@@ -5,55 +5,119 @@ Table: snocks-analytics.marts_finance_euw3.ad_create_roas
 """
 
 import logging
-from google.cloud import bigquery
+import threading
+from datetime import date
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 
 BQ_TABLE = "snocks-analytics.marts_finance_euw3.ad_create_roas"
 META_CHANNELS = ["Meta Ads", "Facebook"]
+PAGE_SIZE = 5000
 
 
-def fetch_ads_data() -> tuple[list[dict], int]:
+QUERY = f"""
+SELECT
+  company,
+  extracted_CR_number,
+  ad_names,
+  channels,
+  first_date,
+  last_date,
+  CAST(revenue AS FLOAT64) AS revenue,
+  CAST(spend   AS FLOAT64) AS spend,
+  CAST(roas    AS FLOAT64) AS roas
+FROM `{BQ_TABLE}`
+WHERE channels IN UNNEST(@channels)
+"""
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """Shared BigQuery client; the SDK is imported on first use (cold start)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google.cloud import bigquery
+            _client = bigquery.Client()
+        return _client
+
+
+def warm_up() -> None:
+    """Import the SDK and build the client ahead of the first ETL run."""
+    _get_client()
+
+
+def _build_query(date_from: date = None, date_to: date = None) -> tuple[str, list]:
     """
-    Fetch all Meta Ads creative data from BigQuery.
-    Returns (rows as list of dicts, bytes scanned).
+    ETL query plus parameters. With a date range only rows whose first_date
+    lies in [date_from, date_to) are selected (backfill chunks).
     """
-    client = bigquery.Client()
-
-    query = f"""
-    SELECT
-      company,
-      extracted_CR_number,
-      ad_names,
-      channels,
-      first_date,
-      last_date,
-      CAST(revenue AS FLOAT64) AS revenue,
-      CAST(spend   AS FLOAT64) AS spend,
-      CAST(roas    AS FLOAT64) AS roas
-    FROM `{BQ_TABLE}`
-    WHERE channels IN UNNEST(@channels)
+    from google.cloud import bigquery
+
+    query = QUERY
+    params = [bigquery.ArrayQueryParameter("channels", "STRING", META_CHANNELS)]
+    if date_from is not None:
+        query += "AND first_date >= @date_from\n"
+        params.append(bigquery.ScalarQueryParameter("date_from", "DATE", date_from))
+    if date_to is not None:
+        query += "AND first_date < @date_to\n"
+        params.append(bigquery.ScalarQueryParameter("date_to", "DATE", date_to))
+    return query, params
+
+
+def fetch_ads_pages(date_from: date = None, date_to: date = None,
+                    page_size: int = PAGE_SIZE) -> tuple[Iterator[list[dict]], int]:
     """
+    Run the ETL query and stream the result page by page.
+    Blocks until the query job is done, so bytes scanned are known up front;
+    the pages themselves are downloaded lazily while the iterator is consumed.
+    Returns (iterator of row-dict pages, bytes scanned).
+    """
+    from google.cloud import bigquery
 
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ArrayQueryParameter("channels", "STRING", META_CHANNELS)
-        ]
-    )
+    client = _get_client()
+    query, params = _build_query(date_from, date_to)
+    job_config = bigquery.QueryJobConfig(query_parameters=params)
 
-    logger.info(f"Querying {BQ_TABLE} for channels: {META_CHANNELS}")
+    date_range = f", first_date in [{date_from}, {date_to})" if date_from or date_to else ""
+    logger.info(f"Querying {BQ_TABLE} for channels: {META_CHANNELS}{date_range}")
     job = client.query(query, job_config=job_config)
-    rows = [dict(row) for row in job.result()]
+    result = job.result(page_size=page_size)
     bytes_scanned = job.total_bytes_processed or 0
-    logger.info(f"Fetched {len(rows)} rows ({bytes_scanned:,} bytes scanned)")
+    logger.info(f"Query done: {result.total_rows} rows ({bytes_scanned:,} bytes scanned)")
 
-    return rows, bytes_scanned
+    pages = ([dict(row) for row in page] for page in result.pages)
+    return pages, bytes_scanned
+
+
+def estimate_query_bytes(date_from: date = None, date_to: date = None) -> int:
+    """
+    Run the ETL query as a BigQuery dry-run job.
+    Returns the bytes the query would scan; nothing is billed.
+    """
+    from google.cloud import bigquery
+
+    client = _get_client()
+    query, params = _build_query(date_from, date_to)
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=params,
+        dry_run=True,
+        use_query_cache=False,
+    )
+    job = client.query(query, job_config=job_config)
+    bytes_estimated = job.total_bytes_processed or 0
+    logger.info(f"Dry run: query would scan {bytes_estimated:,} bytes")
+    return bytes_estimated
 
 
 def test_connection() -> dict:
     """Test BigQuery connection and return table info."""
     try:
-        client = bigquery.Client()
+        client = _get_client()
         table = client.get_table(BQ_TABLE)
         return {
             "table": BQ_TABLE,
@@ -0,0 +1,127 @@
+"""
+Creative Dashboard ETL – CLI
+
+Führt run_etl() ohne HTTP-Server aus, z.B. lokal oder als Cloud Run Job.
+
+    PYTHONPATH=src python -m cli              # voller Sync
+    PYTHONPATH=src python -m cli --dry-run    # Kostenschätzung + Write-Diff, schreibt nichts
+
+Backfill: der Zeitraum wird in Chunks nach first_date zerlegt, die parallel
+laufen. Jeder Chunk ist ein eigener run_etl()-Aufruf mit eigenem etl_sync_log.
+
+    PYTHONPATH=src python -m cli --from 2024-01-01 --to 2025-01-01 --chunk-days 30 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from etl import run_etl
+
+logger = logging.getLogger(__name__)
+
+
+def date_chunks(date_from: date, date_to: date, chunk_days: int) -> list[tuple[date, date]]:
+    """Split [date_from, date_to) into half-open chunks of at most chunk_days."""
+    if chunk_days < 1:
+        raise ValueError("chunk_days must be >= 1")
+    chunks = []
+    start = date_from
+    while start < date_to:
+        end = min(start + timedelta(days=chunk_days), date_to)
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+def run_backfill(date_from: date, date_to: date, chunk_days: int, workers: int,
+                 dry_run: bool = False, profile: bool = False) -> dict:
+    """Run one ETL per chunk with `workers` chunks in flight; returns a summary."""
+    chunks = date_chunks(date_from, date_to, chunk_days)
+    logger.info(f"Backfill {date_from} – {date_to}: {len(chunks)} Chunks à {chunk_days} Tage, {workers} Worker")
+
+    results = []
+    failed = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill") as executor:
+        futures = {
+            executor.submit(run_etl, dry_run=dry_run, date_from=start, date_to=end, profile=profile): (start, end)
+            for start, end in chunks
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            start, end = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append({"date_from": str(start), "date_to": str(end), "error": str(e)})
+                logger.error(f"[{done}/{len(chunks)}] {start} – {end} fehlgeschlagen: {e}")
+                continue
+            results.append({"date_from": str(start), "date_to": str(end), **result})
+            logger.info(
+                f"[{done}/{len(chunks)}] {start} – {end}: {result.get('rows_processed', 0)} Zeilen "
+                f"({time.perf_counter() - started:.1f} s seit Start)"
+            )
+
+    results.sort(key=lambda r: r["date_from"])
+    return {
+        "status":         "failed" if failed else ("dry_run" if dry_run else "success"),
+        "chunks":         len(chunks),
+        "rows_processed": sum(r.get("rows_processed", 0) for r in results),
+        "duration_s":     round(time.perf_counter() - started, 1),
+        "results":        results,
+        "failed":         failed,
+    }
+
+
+def main(argv: list[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="cli", description="Creative Dashboard ETL")
+    arg_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="BigQuery-Dry-Run + Write-Diff, nichts nach Supabase schreiben",
+    )
+    arg_parser.add_argument(
+        "--profile", action="store_true",
+        help="cProfile des Runs als pstats-Datei schreiben (ETL_PROFILE_DIR)",
+    )
+    arg_parser.add_argument(
+        "--from", dest="date_from", type=date.fromisoformat,
+        help="Backfill ab first_date (inklusive, YYYY-MM-DD); Zeilen ohne first_date werden nicht erfasst",
+    )
+    arg_parser.add_argument(
+        "--to", dest="date_to", type=date.fromisoformat,
+        help="Backfill bis first_date (exklusive, YYYY-MM-DD), Default: morgen",
+    )
+    arg_parser.add_argument("--chunk-days", type=int, default=30, help="Tage pro Chunk (Default: 30)")
+    arg_parser.add_argument("--workers", type=int, default=4, help="parallele Chunks (Default: 4)")
+    args = arg_parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    if args.date_to is not None and args.date_from is None:
+        arg_parser.error("--to requires --from")
+    if args.workers < 1:
+        arg_parser.error("--workers must be >= 1")
+    if args.chunk_days < 1:
+        arg_parser.error("--chunk-days must be >= 1")
+
+    try:
+        if args.date_from is not None:
+            date_to = args.date_to or date.today() + timedelta(days=1)
+            result = run_backfill(
+                args.date_from, date_to, args.chunk_days, args.workers, args.dry_run, args.profile
+            )
+        else:
+            result = run_etl(dry_run=args.dry_run, profile=args.profile)
+    except Exception as e:
+        print(json.dumps({"status": "failed", "error": str(e)}), file=sys.stderr)
+        return 1
+
+    print(json.dumps(result, indent=2, default=str))
+    return 1 if result.get("status") == "failed" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Dedup Store – Creative Dashboard ETL
+
+Hält die Dedup-Schlüssel eines Runs:
+
+  - pro ad_name_raw, ob das Creative den Source-Filter passiert (erster Parse gewinnt)
+  - die Menge der (ad_name_raw, channels)-Keys für die Reconciliation,
+    im Dry Run samt Diff-Ergebnis pro Key (letzter Batch gewinnt)
+
+Standardmäßig in Python-Dicts. Mit einem Memory-Budget (ETL_MEMORY_BUDGET_MB)
+wird bei Überschreitung der geschätzten Größe in eine temporäre SQLite-Datei
+ausgelagert (ETL_SPILL_DIR, Default: System-Tempdir). Auf Cloud Run liegt /tmp
+im Arbeitsspeicher – SQLite ist dort trotzdem um ein Vielfaches kompakter als
+Dicts; besser ist ein gemountetes Volume als ETL_SPILL_DIR.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Grobe Python-Overheads pro Eintrag (Dict-Slot, str-Objekt, Tupel)
+_CREATIVE_OVERHEAD = 120
+_METRIC_KEY_OVERHEAD = 200
+
+# NULL ist in SQLite-Primary-Keys nicht eindeutig → channels=None kodieren
+_NULL_CHANNEL = "\x00"
+
+
+class _KeyView:
+    """Read-only view supporting `in`, iteration and len() – enough for reconciliation."""
+
+    def __init__(self, contains, iterate, count):
+        self._contains = contains
+        self._iterate = iterate
+        self._count = count
+
+    def __contains__(self, key) -> bool:
+        return self._contains(key)
+
+    def __iter__(self):
+        return self._iterate()
+
+    def __len__(self) -> int:
+        return self._count()
+
+
+class KeyStore:
+    """Dedup keys of one ETL run, in memory until memory_budget_bytes is exceeded."""
+
+    def __init__(self, memory_budget_bytes: int = None, spill_dir: str = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+        self._allowed_by_name: dict[str, bool] = {}
+        self._metric_keys: dict[tuple[str, str], Optional[str]] = {}
+        self._estimated_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[str] = None
+        # Parser (add_*) und Metric-Writer (set_metric_outcomes) laufen parallel;
+        # der Lock verhindert, dass Outcomes während des Auslagerns verloren gehen
+        self._spill_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "KeyStore":
+        budget_mb = float(os.environ.get("ETL_MEMORY_BUDGET_MB", "0"))
+        return cls(
+            memory_budget_bytes=int(budget_mb * 1024 * 1024) or None,
+            spill_dir=os.environ.get("ETL_SPILL_DIR") or None,
+        )
+
+    @property
+    def spilled(self) -> bool:
+        return self._db is not None
+
+    # -- Creatives --------------------------------------------------------
+
+    def creative_allowed(self, ad_name: str) -> Optional[bool]:
+        """Filter decision of the first parse, or None if the creative is new."""
+        if self._db is None:
+            return self._allowed_by_name.get(ad_name)
+        row = self._db.execute("SELECT allowed FROM creatives WHERE name = ?", (ad_name,)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def add_creative(self, ad_name: str, allowed: bool) -> None:
+        """Record the filter decision; an existing decision is kept."""
+        if self._db is None:
+            if ad_name not in self._allowed_by_name:
+                self._allowed_by_name[ad_name] = allowed
+                self._grow(sys.getsizeof(ad_name) + _CREATIVE_OVERHEAD)
+        else:
+            self._db.execute("INSERT OR IGNORE INTO creatives VALUES (?, ?)", (ad_name, int(allowed)))
+
+    @property
+    def creative_count(self) -> int:
+        if self._db is None:
+            return len(self._allowed_by_name)
+        return self._db.execute("SELECT COUNT(*) FROM creatives").fetchone()[0]
+
+    def dimension_names(self) -> _KeyView:
+        """ad_name_raw of all creatives that passed the filter."""
+        if self._db is None:
+            names = self._allowed_by_name
+            return _KeyView(
+                lambda name: names.get(name, False),
+                lambda: (name for name, allowed in names.items() if allowed),
+                lambda: sum(names.values()),
+            )
+        db = self._db
+        return _KeyView(
+            lambda name: db.execute(
+                "SELECT 1 FROM creatives WHERE name = ? AND allowed = 1", (name,)
+            ).fetchone() is not None,
+            lambda: (row[0] for row in db.execute("SELECT name FROM creatives WHERE allowed = 1")),
+            lambda: db.execute("SELECT COUNT(*) FROM creatives WHERE allowed = 1").fetchone()[0],
+        )
+
+    # -- Metric keys ------------------------------------------------------
+
+    def add_metric_keys(self, keys: list[tuple[str, str]]) -> None:
+        if self._db is None:
+            nbytes = 0
+            for key in keys:
+                if key not in self._metric_keys:
+                    self._metric_keys[key] = None
+                    nbytes += sys.getsizeof(key[0]) + _METRIC_KEY_OVERHEAD
+            if nbytes:
+                self._grow(nbytes)
+        else:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO metric_keys (name, channels) VALUES (?, ?)",
+                [(name, _NULL_CHANNEL if channels is None else channels) for name, channels in keys],
+            )
+
+    def metric_keys(self) -> _KeyView:
+        """All (ad_name_raw, channels) keys seen in this run."""
+        if self._db is None:
+            keys = self._metric_keys
+            return _KeyView(keys.__contains__, lambda: iter(keys), lambda: len(keys))
+        db = self._db
+
+        def contains(key) -> bool:
+            name, channels = key
+            return db.execute(
+                "SELECT 1 FROM metric_keys WHERE name = ? AND channels = ?",
+                (name, _NULL_CHANNEL if channels is None else channels),
+            ).fetchone() is not None
+
+        def iterate() -> Iterator[tuple[str, str]]:
+            for name, channels in db.execute("SELECT name, channels FROM metric_keys"):
+                yield name, (None if channels == _NULL_CHANNEL else channels)
+
+        return _KeyView(
+            contains, iterate, lambda: db.execute("SELECT COUNT(*) FROM metric_keys").fetchone()[0]
+        )
+
+    def set_metric_outcomes(self, outcomes: dict[tuple[str, str], str]) -> None:
+        """Record the dry-run diff outcome per metric key; a later call overwrites."""
+        with self._spill_lock:
+            if self._db is None:
+                self._metric_keys.update(outcomes)
+                return
+            self._db.executemany(
+                "INSERT INTO metric_keys VALUES (?, ?, ?) "
+                "ON CONFLICT (name, channels) DO UPDATE SET outcome = excluded.outcome",
+                [(name, _NULL_CHANNEL if channels is None else channels, outcome)
+                 for (name, channels), outcome in outcomes.items()],
+            )
+
+    def metric_outcome_counts(self) -> dict[str, int]:
+        """Number of metric keys per recorded outcome, each key counted once."""
+        if self._db is None:
+            counts: dict[str, int] = {}
+            for outcome in self._metric_keys.values():
+                if outcome is not None:
+                    counts[outcome] = counts.get(outcome, 0) + 1
+            return counts
+        return dict(self._db.execute(
+            "SELECT outcome, COUNT(*) FROM metric_keys WHERE outcome IS NOT NULL GROUP BY outcome"
+        ))
+
+    # -- Spill ------------------------------------------------------------
+
+    def _grow(self, nbytes: int) -> None:
+        self._estimated_bytes += nbytes
+        if self.memory_budget_bytes and self._estimated_bytes > self.memory_budget_bytes:
+            self._spill()
+
+    def _spill(self) -> None:
+        with self._spill_lock:
+            self._spill_locked()
+
+    def _spill_locked(self) -> None:
+        fd, self._db_path = tempfile.mkstemp(prefix="etl-keys-", suffix=".sqlite", dir=self.spill_dir)
+        os.close(fd)
+        # Zugriff aus Parser-, Metric-Writer- und Haupt-Thread; SQLite serialisiert pro Connection
+        db = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.execute("CREATE TABLE creatives (name TEXT PRIMARY KEY, allowed INTEGER NOT NULL) WITHOUT ROWID")
+        db.execute(
+            "CREATE TABLE metric_keys (name TEXT NOT NULL, channels TEXT NOT NULL, outcome TEXT, "
+            "PRIMARY KEY (name, channels)) WITHOUT ROWID"
+        )
+        db.executemany("INSERT INTO creatives VALUES (?, ?)",
+                       ((name, int(allowed)) for name, allowed in self._allowed_by_name.items()))
+        db.executemany("INSERT INTO metric_keys VALUES (?, ?, ?)",
+                       ((name, _NULL_CHANNEL if channels is None else channels, outcome)
+                        for (name, channels), outcome in self._metric_keys.items()))
+        logger.warning(
+            f"Dedup-Keys überschreiten Memory-Budget ({self._estimated_bytes:,} > "
+            f"{self.memory_budget_bytes:,} B) – ausgelagert nach {self._db_path}"
+        )
+        self._db = db
+        self._allowed_by_name = {}
+        self._metric_keys = {}
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            os.unlink(self._db_path)
+
+    def __enter__(self) -> "KeyStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,113 @@
+"""
+Creative Dashboard ETL – Run
+
+Ein ETL-Run ohne HTTP-Bezug: BigQuery → Parse → Supabase. Wird vom
+Cloud-Run-Service (main.py) und von der CLI (cli.py) aufgerufen.
+"""
+
+import logging
+from datetime import date
+
+from bigquery_client import fetch_ads_pages, estimate_query_bytes
+from dedup_store import KeyStore
+from pipeline import run_pipeline
+from profiling import ProfileSession, profile_path, profiling_enabled
+from reconcile import reconcile_deletions
+from supabase_client import write_sync_log, update_sync_log
+
+logger = logging.getLogger(__name__)
+
+NO_DELETIONS = {"dimensions_deleted": 0, "metrics_deleted": 0}
+
+
+def run_etl(dry_run: bool = False, date_from: date = None, date_to: date = None,
+            profile: bool = False):
+    """
+    ETL: BigQuery → parse → Supabase.
+
+    Mit dry_run=True wird nichts geschrieben (auch kein etl_sync_log): die Query
+    läuft zusätzlich als BigQuery-Dry-Run für die Kostenschätzung, und statt der
+    Upserts/Deletes wird ein Write-Diff gegen den aktuellen Tabellenstand berichtet.
+
+    date_from/date_to begrenzen den Run auf first_date in [date_from, date_to)
+    (Backfill-Chunks). Ein solcher Teil-Run kennt nicht alle Keys und löscht
+    deshalb nichts (keine Reconciliation).
+
+    profile=True (oder ETL_PROFILE=1) schreibt ein cProfile des Runs als
+    pstats-Datei und trägt den Pfad in etl_sync_log.profile_path ein.
+    """
+    partial = date_from is not None or date_to is not None
+    sync_id = None if dry_run else write_sync_log()
+    logger.info(f"ETL gestartet – sync_id={sync_id}, dry_run={dry_run}, first_date in [{date_from}, {date_to})")
+
+    session = ProfileSession(profile_path(sync_id)) if profile or profiling_enabled() else None
+    if session:
+        session.start()
+
+    try:
+        # 1. Query starten – die Seiten werden erst in der Pipeline geladen
+        bytes_estimated = estimate_query_bytes(date_from, date_to) if dry_run else None
+        pages, bytes_scanned = fetch_ads_pages(date_from, date_to)
+
+        # 2.–4. BigQuery-Seiten → Parse/Filter → Supabase (bzw. Write-Diff), überlappend
+        with KeyStore.from_env() as keys:
+            result = run_pipeline(pages, keys, dry_run=dry_run, profile=session)
+            rows_processed = result["rows"]
+            logger.info(
+                f"{rows_processed} Zeilen verarbeitet, {result['unique_creatives']} einzigartige Creatives "
+                f"({result['parse_errors']} mit Warnungen), {len(keys.dimension_names())} CreativeTeam-Creatives"
+            )
+
+            # 5. Verschwundene Creatives entfernen (nur bei vollem, nicht-leerem Run)
+            if partial or not rows_processed:
+                deleted = NO_DELETIONS
+            else:
+                deleted = reconcile_deletions(keys.dimension_names(), keys.metric_keys(), dry_run=dry_run)
+
+        # Profil vor dem Sync-Log schreiben, damit profile_path nur auf existierende Dateien zeigt
+        profile_file = session.stop() if session else None
+
+        if dry_run:
+            logger.info(f"Dry Run – Dimensions: {result['dimensions']}, Metriken: {result['metrics']}, Deletes: {deleted}")
+            return {
+                "status":              "dry_run",
+                "rows_processed":      rows_processed,
+                "bq_bytes_estimated":  bytes_estimated,
+                "dimensions":          {**result["dimensions"], "delete": deleted["dimensions_deleted"]},
+                "metrics":             {**result["metrics"], "delete": deleted["metrics_deleted"]},
+                "parse_errors":        result["parse_errors"],
+                "stages":              result["stages"],
+                "profile_path":        profile_file,
+            }
+
+        update_sync_log(
+            sync_id,
+            status="success",
+            rows_processed=rows_processed,
+            bq_bytes=bytes_scanned,
+            profile_path=profile_file,
+        )
+        logger.info(f"ETL abgeschlossen – {rows_processed} Zeilen verarbeitet")
+
+        return {
+            "status":               "success",
+            "rows_processed":       rows_processed,
+            "dimensions_upserted":  result["dimensions"]["records"],
+            "metrics_upserted":     result["metrics"]["records"],
+            "dimensions_deleted":   deleted["dimensions_deleted"],
+            "metrics_deleted":      deleted["metrics_deleted"],
+            "parse_errors":         result["parse_errors"],
+            "stages":               result["stages"],
+            "profile_path":         profile_file,
+        }
+
+    except Exception as e:
+        logger.error(f"ETL fehlgeschlagen: {e}", exc_info=True)
+        profile_file = session.stop() if session else None
+        if sync_id is not None:
+            update_sync_log(sync_id, status="failed", error_message=str(e), profile_path=profile_file)
+        raise
+
+    finally:
+        if session:
+            session.stop()
@@ -8,17 +8,14 @@ und synchronisiert nach Supabase.
 
 import os
 import logging
+import threading
 
 from flask import Flask, request, jsonify
 
-from bigquery_client import fetch_ads_data
-from parser import parse_ad_name
-from supabase_client import (
-    upsert_dimensions,
-    upsert_creative_metrics,
-    write_sync_log,
-    update_sync_log,
-)
+import aggregates
+import bigquery_client
+import supabase_client
+from etl import run_etl
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,107 +25,80 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# BigQuery- und Supabase-SDK werden erst bei Bedarf importiert (Cold Start).
+# Nach dem ersten Request (i.d.R. der Startup-/Health-Probe) werden die Clients
+# im Hintergrund aufgebaut, damit der erste ETL-Run sie nicht selbst zahlt.
+_warm_up_started = threading.Event()
 
-def run_etl():
-    """ETL: BigQuery → parse → Supabase."""
-    sync_id = write_sync_log()
-    logger.info(f"ETL gestartet – sync_id={sync_id}")
 
-    try:
-        # 1. Daten aus BigQuery laden
-        rows, bytes_scanned = fetch_ads_data()
-        logger.info(f"{len(rows)} Zeilen aus BigQuery geladen")
-
-        if not rows:
-            logger.info("Keine Daten zu verarbeiten")
-            update_sync_log(sync_id, status="success", rows_processed=0, bq_bytes=bytes_scanned)
-            return {"status": "success", "rows_processed": 0}
-
-        # 2. Naming Convention parsen – Deduplizierung nach ad_name_raw
-        dimensions_by_name = {}
-        parse_error_count = 0
-
-        for row in rows:
-            ad_name = row.get("ad_names", "") or ""
-            if ad_name in dimensions_by_name:
-                continue  # Creative bereits geparst
-
-            parsed = parse_ad_name(ad_name)
-            parsed["ad_name_raw"] = ad_name
-
-            if parsed.get("parse_errors"):
-                parse_error_count += 1
-
-            dimensions_by_name[ad_name] = parsed
-
-        dimensions = list(dimensions_by_name.values())
-        logger.info(f"{len(dimensions)} einzigartige Creatives geparst ({parse_error_count} mit Warnungen)")
-
-        # Filter: nur CreativeTeam-Ads nach Supabase
-        ALLOWED_SOURCES = {"CreativeTeam"}
-        creative_team_names = {
-            d["ad_name_raw"] for d in dimensions
-            if d.get("creative_source") in ALLOWED_SOURCES
-        }
-        dimensions = [d for d in dimensions if d["ad_name_raw"] in creative_team_names]
-        logger.info(f"{len(dimensions)} CreativeTeam-Creatives nach Filter")
-
-        # 3. Metriken aufbereiten – deduplizieren nach (ad_name_raw, channels)
-        metrics_by_key = {}
-        for row in rows:
-            if row.get("ad_names", "") not in creative_team_names:
-                continue
-            key = (row.get("ad_names", ""), row.get("channels", ""))
-            metrics_by_key[key] = {
-                "ad_name_raw": row.get("ad_names", ""),
-                "company":     row.get("company", ""),
-                "channels":    row.get("channels", ""),
-                "first_date":  row.get("first_date"),
-                "last_date":   row.get("last_date"),
-                "revenue":     row.get("revenue"),
-                "spend":       row.get("spend"),
-                "roas":        row.get("roas"),
-            }
-        metrics = list(metrics_by_key.values())
-
-        # 4. Nach Supabase schreiben
-        dims_count = upsert_dimensions(dimensions)
-        logger.info(f"{dims_count} Dimension-Zeilen upserted")
-
-        metrics_count = upsert_creative_metrics(metrics)
-        logger.info(f"{metrics_count} Metrik-Zeilen upserted")
-
-        update_sync_log(
-            sync_id,
-            status="success",
-            rows_processed=len(rows),
-            bq_bytes=bytes_scanned,
-        )
-        logger.info(f"ETL abgeschlossen – {len(rows)} Zeilen verarbeitet")
-
-        return {
-            "status":               "success",
-            "rows_processed":       len(rows),
-            "dimensions_upserted":  dims_count,
-            "metrics_upserted":     metrics_count,
-            "parse_errors":         parse_error_count,
-        }
+def _warm_up_clients():
+    for module in (bigquery_client, supabase_client):
+        try:
+            module.warm_up()
+        except Exception as e:
+            logger.warning(f"Warm-up {module.__name__} fehlgeschlagen: {e}")
 
-    except Exception as e:
-        logger.error(f"ETL fehlgeschlagen: {e}", exc_info=True)
-        update_sync_log(sync_id, status="failed", error_message=str(e))
-        raise
+
+@app.before_request
+def _start_warm_up():
+    if not _warm_up_started.is_set():
+        _warm_up_started.set()
+        threading.Thread(target=_warm_up_clients, name="client-warm-up", daemon=True).start()
+
+
+def _flag(name: str) -> bool:
+    """Read a boolean flag from the query string or the JSON body."""
+    value = request.args.get(name)
+    if value is None:
+        body = request.get_json(silent=True) or {}
+        value = body.get(name, False)
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
 
 
 @app.route("/", methods=["POST"])
 def handle_trigger():
-    """HTTP-Endpoint für Cloud Scheduler."""
+    """
+    HTTP-Endpoint für Cloud Scheduler.
+    `?dry_run=true` bzw. {"dry_run": true} schreibt nichts; `?profile=true` oder
+    Header `X-ETL-Profile: 1` profiliert den Run.
+    """
     try:
-        result = run_etl()
-        return jsonify(result), 200
+        dry_run = _flag("dry_run")
+        profile = _flag("profile") or request.headers.get("X-ETL-Profile", "").lower() in ("1", "true", "yes")
+        result = run_etl(dry_run=dry_run, profile=profile)
     except Exception as e:
         return jsonify({"status": "failed", "error": str(e)}), 500
 
+    if not dry_run:
+        # Neuer Stand → Aggregat-Snapshot (und damit dessen Cache) ersetzen
+        try:
+            aggregates.refresh_snapshot()
+        except Exception as e:
+            logger.warning(f"Aggregat-Snapshot konnte nicht aufgebaut werden: {e}")
+    return jsonify(result), 200
+
+
+@app.route("/aggregates", methods=["GET"])
+def get_aggregates():
+    """Dashboard-Aggregate aus dem In-Memory-Snapshot, z.B. `?group_by=product,hook`."""
+    try:
+        group_by = aggregates.parse_group_by(request.args.get("group_by", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        snapshot = aggregates.get_snapshot()
+    except Exception as e:
+        return jsonify({"error": f"Snapshot nicht verfügbar: {e}"}), 503
+
+    return jsonify({
+        "group_by":          list(group_by),
+        "snapshot_built_at": snapshot.built_at,
+        "rows":              snapshot.aggregate(group_by),
+    }), 200
+
 
 @app.route("/health", methods=["GET"])
 def health():
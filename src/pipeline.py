@@ -0,0 +1,285 @@
+"""Pipeline – Creative Dashboard ETL
+
+Überlappt die ETL-Stufen, statt sie nacheinander abzuarbeiten:
+
+    reader ──Seiten──▶ parser ──Dimensions──▶ dimension writer
+                              └──Metriken───▶ metric writer
+
+Jede Stufe ist ein Thread, verbunden über begrenzte Queues. Die ersten Batches
+werden geschrieben, während BigQuery noch spätere Seiten liefert; ist ein
+Writer langsamer, blockiert die volle Queue den Parser und dieser den Reader
+(Backpressure) – es sind höchstens QUEUE_SIZE Seiten pro Queue im Speicher.
+
+Dedup-Semantik wie bisher: pro ad_name_raw gewinnt der erste Parse, pro
+(ad_name_raw, channels) die letzte Zeile (der Metric-Writer schreibt in
+Eingangsreihenfolge und dedupliziert innerhalb eines Batches). Die Dedup-Keys
+liegen im KeyStore, der bei Bedarf auf Disk auslagert (siehe dedup_store).
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable
+
+from dedup_store import KeyStore
+from parser import parse_ad_name
+from profiling import ProfileSession
+from supabase_client import (
+    BATCH_SIZE,
+    dimension_signature,
+    new_upsert_stats,
+    log_upsert_stats,
+    upsert_dimensions,
+    upsert_creative_metrics,
+    diff_dimensions,
+    classify_creative_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+# Filter: nur CreativeTeam-Ads nach Supabase
+ALLOWED_SOURCES = {"CreativeTeam"}
+
+QUEUE_SIZE = 4          # Seiten bzw. Parser-Ausgaben pro Queue
+MAX_BUFFERED_DIMENSIONS = 4 * BATCH_SIZE   # Obergrenze der nach Signatur gepufferten Dimensions
+POLL_SECONDS = 0.2      # Abbruch-Check beim Warten auf eine Queue
+
+_DONE = object()
+
+
+class _Aborted(Exception):
+    """Another stage failed; this stage stops without further work."""
+
+
+class _Stage:
+    """Bookkeeping for one stage: wall time, time starved on input, time blocked on output."""
+
+    def __init__(self, name: str, abort: threading.Event):
+        self.name = name
+        self.abort = abort
+        self.started = self.finished = None
+        self.wait_input = 0.0
+        self.wait_output = 0.0
+
+    def get(self, q: queue.Queue):
+        started = time.perf_counter()
+        try:
+            while True:
+                if self.abort.is_set():
+                    raise _Aborted
+                try:
+                    return q.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+        finally:
+            self.wait_input += time.perf_counter() - started
+
+    def put(self, q: queue.Queue, item) -> None:
+        started = time.perf_counter()
+        try:
+            while True:
+                if self.abort.is_set():
+                    raise _Aborted
+                try:
+                    return q.put(item, timeout=POLL_SECONDS)
+                except queue.Full:
+                    continue
+        finally:
+            self.wait_output += time.perf_counter() - started
+
+    def report(self) -> dict:
+        total = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        return {
+            "total_s":          round(total, 3),
+            "busy_s":           round(total - self.wait_input - self.wait_output, 3),
+            "idle_input_s":     round(self.wait_input, 3),
+            "blocked_output_s": round(self.wait_output, 3),
+        }
+
+
+def _read(stage: _Stage, pages: Iterable[list[dict]], out: queue.Queue) -> None:
+    for page in pages:
+        stage.put(out, page)
+    stage.put(out, _DONE)
+
+
+def _parse(stage: _Stage, pages: queue.Queue, dims_out: queue.Queue,
+           metrics_out: queue.Queue, keys: KeyStore, state: dict) -> None:
+    while (page := stage.get(pages)) is not _DONE:
+        dimensions, metrics = [], []
+        for row in page:
+            state["rows"] += 1
+            ad_name = row.get("ad_names", "") or ""
+
+            allowed = keys.creative_allowed(ad_name)
+            if allowed is None:
+                # Erster Treffer: parsen, Ergebnis gilt für alle weiteren Zeilen
+                parsed = parse_ad_name(ad_name)
+                parsed["ad_name_raw"] = ad_name
+                if parsed.get("parse_errors"):
+                    state["parse_errors"] += 1
+                allowed = parsed.get("creative_source") in ALLOWED_SOURCES
+                keys.add_creative(ad_name, allowed)
+                if allowed:
+                    dimensions.append(parsed)
+            if not allowed:
+                continue
+
+            metrics.append({
+                "ad_name_raw": ad_name,
+                "company":     row.get("company", ""),
+                "channels":    row.get("channels", ""),
+                "first_date":  row.get("first_date"),
+                "last_date":   row.get("last_date"),
+                "revenue":     row.get("revenue"),
+                "spend":       row.get("spend"),
+                "roas":        row.get("roas"),
+            })
+
+        if metrics:
+            keys.add_metric_keys([(m["ad_name_raw"], m["channels"]) for m in metrics])
+        if dimensions:
+            stage.put(dims_out, dimensions)
+        if metrics:
+            stage.put(metrics_out, metrics)
+
+    stage.put(dims_out, _DONE)
+    stage.put(metrics_out, _DONE)
+
+
+def _write_dimensions(stage: _Stage, items: queue.Queue, write: Callable[[list[dict]], None]) -> None:
+    # Pro Spalten-Signatur puffern, damit jeder Batch homogen und voll ist;
+    # werden zu viele Zeilen gepuffert, geht die größte Gruppe vorzeitig raus.
+    pending: dict[tuple, list[dict]] = {}
+    buffered = 0
+    while (dimensions := stage.get(items)) is not _DONE:
+        for d in dimensions:
+            signature = dimension_signature(d)
+            group = pending.setdefault(signature, [])
+            group.append(d)
+            buffered += 1
+            if len(group) >= BATCH_SIZE:
+                write(pending.pop(signature))
+                buffered -= len(group)
+            elif buffered >= MAX_BUFFERED_DIMENSIONS:
+                largest = max(pending, key=lambda sig: len(pending[sig]))
+                buffered -= len(pending[largest])
+                write(pending.pop(largest))
+    for group in pending.values():
+        write(group)
+
+
+def _write_metrics(stage: _Stage, items: queue.Queue, write: Callable[[list[dict]], None]) -> None:
+    # Ein Upsert darf denselben Key nicht zweimal enthalten → innerhalb des
+    # Batches deduplizieren; über Batches hinweg gewinnt der spätere Write.
+    pending = {}
+    while (metrics := stage.get(items)) is not _DONE:
+        for m in metrics:
+            pending[(m["ad_name_raw"], m["channels"])] = m
+            if len(pending) >= BATCH_SIZE:
+                write(list(pending.values()))
+                pending = {}
+    if pending:
+        write(list(pending.values()))
+
+
+def run_pipeline(pages: Iterable[list[dict]], keys: KeyStore, dry_run: bool = False,
+                 profile: ProfileSession = None) -> dict:
+    """
+    Parse, filter and write (or, with dry_run, diff) a stream of BigQuery pages.
+
+    Dedup keys are recorded in `keys`, which afterwards holds the current key
+    sets for reconciliation. With `profile` the stage threads are profiled too.
+    Returns rows, parse_errors, unique_creatives, the written counts (or
+    insert/update/unchanged diffs) and per-stage timings.
+    """
+    abort = threading.Event()
+    page_queue = queue.Queue(QUEUE_SIZE)
+    dims_queue = queue.Queue(QUEUE_SIZE)
+    metrics_queue = queue.Queue(QUEUE_SIZE)
+
+    state = {"rows": 0, "parse_errors": 0}
+
+    if dry_run:
+        # Gespeicherte Zeilen nur für die Keys des jeweiligen Batches laden
+        dims_result = {"insert": 0, "update": 0, "unchanged": 0}
+        metrics_result = {"insert": 0, "update": 0, "unchanged": 0}
+
+        def write_dims(batch):
+            for k, v in diff_dimensions(batch).items():
+                dims_result[k] += v
+
+        def write_metrics(batch):
+            # Ein Metrik-Key kann in mehreren Batches vorkommen (siehe _write_metrics):
+            # Ergebnis pro Key im KeyStore merken und am Ende zählen, der letzte Batch gewinnt
+            keys.set_metric_outcomes(classify_creative_metrics(batch))
+    else:
+        dims_result = new_upsert_stats()
+        metrics_result = new_upsert_stats()
+
+        def write_dims(batch):
+            upsert_dimensions(batch, stats=dims_result)
+
+        def write_metrics(batch):
+            upsert_creative_metrics(batch, stats=metrics_result)
+
+    stages = {name: _Stage(name, abort) for name in ("reader", "parser", "dimension_writer", "metric_writer")}
+    errors = []
+
+    def run(stage: _Stage, target, *args):
+        stage.started = time.perf_counter()
+        try:
+            target(stage, *args)
+        except _Aborted:
+            pass
+        except Exception as e:
+            logger.error(f"Pipeline-Stufe {stage.name} fehlgeschlagen: {e}")
+            errors.append(e)
+            abort.set()
+        finally:
+            stage.finished = time.perf_counter()
+
+    stage_targets = [
+        ("reader",           _read,              (pages, page_queue)),
+        ("parser",           _parse,             (page_queue, dims_queue, metrics_queue, keys, state)),
+        ("dimension_writer", _write_dimensions,  (dims_queue, write_dims)),
+        ("metric_writer",    _write_metrics,     (metrics_queue, write_metrics)),
+    ]
+    threads = [
+        threading.Thread(
+            target=profile.wrap(run) if profile else run,
+            args=(stages[name], target, *args),
+            name=f"etl-{name}",
+        )
+        for name, target, args in stage_targets
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timings = {name: stage.report() for name, stage in stages.items()}
+    for name, t in timings.items():
+        logger.info(
+            f"Stufe {name}: {t['busy_s']:.2f} s aktiv, {t['idle_input_s']:.2f} s ohne Input, "
+            f"{t['blocked_output_s']:.2f} s durch Backpressure blockiert"
+        )
+
+    if errors:
+        raise errors[0]
+
+    if dry_run:
+        metrics_result.update(keys.metric_outcome_counts())
+    else:
+        log_upsert_stats("parsed_ad_dimensions", dims_result)
+        log_upsert_stats("creative_metrics", metrics_result)
+
+    return {
+        "rows":             state["rows"],
+        "parse_errors":     state["parse_errors"],
+        "unique_creatives": keys.creative_count,
+        "dimensions":       dims_result,
+        "metrics":          metrics_result,
+        "stages":           timings,
+    }
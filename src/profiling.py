@@ -0,0 +1,109 @@
+"""Profiling – Creative Dashboard ETL
+
+Opt-in cProfile für einzelne ETL-Runs (Request-Flag, CLI --profile oder
+ETL_PROFILE=1). Das Ergebnis wird als pstats-Datei nach ETL_PROFILE_DIR
+geschrieben (Default: System-Tempdir) und im etl_sync_log referenziert:
+
+    python -m pstats /tmp/etl-42-20260101T060000.prof
+    snakeviz /tmp/etl-42-20260101T060000.prof
+
+Ohne Flag wird keine ProfileSession erzeugt – kein Overhead.
+"""
+
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Ab Python 3.12 läuft cProfile über sys.monitoring: ein Profiler erfasst alle
+# Threads, ein zweiter gleichzeitiger ist nicht erlaubt. Davor profiliert ein
+# Profiler nur den Thread, in dem er aktiviert wurde.
+_PROFILER_COVERS_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def profiling_enabled() -> bool:
+    """ETL_PROFILE env var as a default for runs without an explicit flag."""
+    return os.environ.get("ETL_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+def profile_path(sync_id) -> str:
+    directory = os.environ.get("ETL_PROFILE_DIR") or tempfile.gettempdir()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return os.path.join(directory, f"etl-{sync_id if sync_id is not None else 'dry-run'}-{stamp}.prof")
+
+
+class ProfileSession:
+    """cProfile of one ETL run, including the pipeline threads started via wrap()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.active = False
+        self._stopped = False
+        self._written: Optional[str] = None
+        self._main = cProfile.Profile()
+        self._thread_profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        try:
+            self._main.enable()
+            self.active = True
+        except ValueError as e:  # 3.12+: anderer Profiler aktiv (z.B. paralleler Backfill-Chunk)
+            logger.warning(f"Profiling nicht möglich: {e}")
+
+    def wrap(self, fn):
+        """Profile `fn` in the thread it runs in (needed before Python 3.12)."""
+        if _PROFILER_COVERS_ALL_THREADS or not self.active:
+            return fn
+
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._thread_profiles.append(profile)
+
+        return profiled
+
+    def stop(self) -> Optional[str]:
+        """
+        Stop profiling and write the merged pstats file to self.path.
+        Returns the path, or None if nothing was written; repeated calls return the same.
+        """
+        if self._stopped:
+            return self._written
+        self._stopped = True
+        if not self.active:
+            return None
+        self._main.disable()
+        self.active = False
+
+        stats = pstats.Stats(self._main)
+        for profile in self._thread_profiles:
+            try:
+                stats.add(profile)
+            except TypeError:  # Thread ohne erfasste Aufrufe
+                continue
+
+        # Ein fehlgeschlagenes Profil darf den ETL-Run nicht scheitern lassen
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            stats.dump_stats(self.path)
+        except Exception as e:
+            logger.warning(f"Profil konnte nicht geschrieben werden ({self.path}): {e}")
+            return None
+        self._written = self.path
+        logger.info(f"Profil geschrieben: {self.path}")
+        return self.path
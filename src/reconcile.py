@@ -0,0 +1,74 @@
+"""Reconciliation – Creative Dashboard ETL
+
+Entfernt Zeilen aus parsed_ad_dimensions und creative_metrics, deren Schlüssel
+im aktuellen Run nicht mehr vorkommen (Ad aus BigQuery verschwunden oder nicht
+mehr im Source-Filter).
+
+Pro Tabelle wird nur die Schlüsselspalte (+ id) geladen, die Differenz lokal
+gebildet und per id in Batches gelöscht – die Schreiblast skaliert mit der
+Anzahl der Änderungen, nicht mit der Tabellengröße.
+"""
+
+import logging
+from typing import Container, Hashable, Iterable
+
+from supabase_client import (
+    fetch_dimension_keys,
+    fetch_creative_metric_keys,
+    delete_dimensions,
+    delete_creative_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+# Schutz gegen Massenlöschung (z.B. leerer BQ-Export oder Parser-Regression):
+# löscht ein Run mehr als diesen Anteil einer Tabelle, wird nichts gelöscht.
+MAX_DELETE_FRACTION = 0.5
+
+
+def stale_ids(stored: dict[Hashable, int], current: Iterable[Hashable]) -> list[int]:
+    """
+    Return the ids of stored keys that are not part of the current run.
+    `current` is used as-is if it supports `in` (set, KeyStore view).
+    """
+    current = current if isinstance(current, Container) else set(current)
+    return [row_id for key, row_id in stored.items() if key not in current]
+
+
+def _guarded(table: str, ids: list[int], stored_count: int) -> list[int]:
+    if stored_count and len(ids) > stored_count * MAX_DELETE_FRACTION:
+        logger.warning(
+            f"Reconciliation für {table} übersprungen: {len(ids)} von {stored_count} "
+            f"Zeilen wären gelöscht worden (> {MAX_DELETE_FRACTION:.0%})"
+        )
+        return []
+    return ids
+
+
+def reconcile_deletions(dimension_names: Iterable[str],
+                        metric_keys: Iterable[tuple[str, str]],
+                        dry_run: bool = False) -> dict:
+    """
+    Delete stored rows whose keys are missing from the current run.
+    Returns {"dimensions_deleted": n, "metrics_deleted": n}; with dry_run
+    the counts are what would be deleted and nothing is written.
+    """
+    stored_metrics = fetch_creative_metric_keys()
+    metric_ids = _guarded(
+        "creative_metrics", stale_ids(stored_metrics, metric_keys), len(stored_metrics)
+    )
+
+    stored_dims = fetch_dimension_keys()
+    dim_ids = _guarded(
+        "parsed_ad_dimensions", stale_ids(stored_dims, dimension_names), len(stored_dims)
+    )
+
+    if dry_run:
+        return {"dimensions_deleted": len(dim_ids), "metrics_deleted": len(metric_ids)}
+
+    metrics_deleted = delete_creative_metrics(metric_ids)
+    dims_deleted = delete_dimensions(dim_ids)
+    logger.info(
+        f"Reconciliation: {dims_deleted} Dimension-Zeilen, {metrics_deleted} Metrik-Zeilen gelöscht"
+    )
+    return {"dimensions_deleted": dims_deleted, "metrics_deleted": metrics_deleted}
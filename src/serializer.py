@@ -0,0 +1,57 @@
+"""Serializer – Creative Dashboard ETL
+
+Kodiert Upsert-Batches für PostgREST direkt zu Bytes.
+
+  - orjson  (Default, falls installiert) – schnell, liefert bytes direkt
+  - json    (stdlib, Fallback)           – kompakte Separatoren, UTF-8
+
+Auswahl über ETL_JSON_SERIALIZER, optionale gzip-Kompression des Request-Bodys
+über SUPABASE_GZIP_LEVEL (1–9, 0 = aus).
+"""
+
+import gzip
+import json
+import os
+from typing import Callable
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _dumps_json(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _dumps_orjson(obj) -> bytes:
+    return orjson.dumps(obj, default=str)
+
+
+SERIALIZERS: dict[str, Callable[[object], bytes]] = {"json": _dumps_json}
+if orjson is not None:
+    SERIALIZERS["orjson"] = _dumps_orjson
+
+
+def get_serializer(name: str = None) -> Callable[[object], bytes]:
+    """
+    Return a dumps function (obj → bytes).
+    Defaults to ETL_JSON_SERIALIZER, else orjson if installed, else json.
+    """
+    name = name or os.environ.get("ETL_JSON_SERIALIZER") or ("orjson" if orjson is not None else "json")
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer {name!r}, available: {sorted(SERIALIZERS)}")
+    return SERIALIZERS[name]
+
+
+def gzip_level() -> int:
+    """Configured gzip level for request bodies (0 = no compression)."""
+    return int(os.environ.get("SUPABASE_GZIP_LEVEL", "0"))
+
+
+def encode_body(obj, dumps: Callable[[object], bytes], level: int = 0) -> tuple[bytes, int]:
+    """Serialize obj and optionally gzip it. Returns (body, uncompressed size)."""
+    raw = dumps(obj)
+    if level:
+        return gzip.compress(raw, compresslevel=level), len(raw)
+    return raw, len(raw)
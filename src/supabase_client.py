@@ -8,11 +8,19 @@ Tabellen:
   - etl_sync_log           eine Zeile pro ETL-Run
 """
 
+from __future__ import annotations
+
 import os
 import logging
+import threading
+import time
 from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterable
+
+from serializer import encode_body, get_serializer, gzip_level
 
-from supabase import create_client, Client
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = logging.getLogger(__name__)
 
@@ -20,93 +28,442 @@ SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
 SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
 
 BATCH_SIZE = 500
+PAGE_SIZE = 1000   # PostgREST max-rows Default
+DELETE_BATCH_SIZE = 500
+LOOKUP_BATCH_SIZE = 100   # Keys pro in.()-Filter, begrenzt die URL-Länge
+
+
+_client = None
+_client_lock = threading.Lock()
 
 
 def _get_client() -> Client:
+    """Shared Supabase client; the SDK is imported on first use (cold start)."""
+    global _client
     if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
         raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    with _client_lock:
+        if _client is None:
+            from supabase import create_client
+            _client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        return _client
 
 
-def _batch_upsert(client: Client, table: str, records: list[dict], on_conflict: str) -> int:
-    total = 0
+def warm_up() -> None:
+    """Import the SDK and build the client ahead of the first ETL run."""
+    _get_client()
+
+
+class UpsertError(RuntimeError):
+    """A PostgREST upsert was rejected; the message carries the PostgREST error body."""
+
+    def __init__(self, table: str, status_code: int, body: str):
+        super().__init__(f"Upsert into {table} failed with HTTP {status_code}: {body}")
+        self.table = table
+        self.status_code = status_code
+        self.body = body
+
+
+def new_upsert_stats() -> dict:
+    """Counters for upsert calls; pass to upsert_* to aggregate across calls."""
+    return {"batches": 0, "records": 0, "json_bytes": 0, "wire_bytes": 0,
+            "serialize_seconds": 0.0, "upsert_seconds": 0.0}
+
+
+def _upsert_batch(client: Client, table: str, batch: list[dict], on_conflict: str,
+                  columns: list[str], dumps, level: int, stats: dict) -> None:
+    """
+    POST one batch straight to PostgREST with a pre-serialized body.
+
+    Bypasses the SDK's json encoding so the serializer (orjson) writes bytes
+    directly and the body can be gzipped. `columns` is sent as the PostgREST
+    column list: listed columns missing from a record are written as NULL.
+    """
+    started = time.perf_counter()
+    body, json_bytes = encode_body(batch, dumps, level)
+    serialize_seconds = time.perf_counter() - started
+
+    headers = {
+        "Content-Type": "application/json",
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+    if level:
+        headers["Content-Encoding"] = "gzip"
+
+    started = time.perf_counter()
+    response = client.postgrest.session.post(
+        f"/{table}",
+        params={"on_conflict": on_conflict, "columns": ",".join(columns)},
+        headers=headers,
+        content=body,
+    )
+    if response.is_error:
+        # message, details, hint von PostgREST landen so in etl_sync_log.error_message
+        raise UpsertError(table, response.status_code, response.text)
+    upsert_seconds = time.perf_counter() - started
+
+    stats["batches"] += 1
+    stats["records"] += len(batch)
+    stats["json_bytes"] += json_bytes
+    stats["wire_bytes"] += len(body)
+    stats["serialize_seconds"] += serialize_seconds
+    stats["upsert_seconds"] += upsert_seconds
+    logger.debug(
+        f"Batch {stats['batches']} → {table}: {len(batch)} records × {len(columns)} columns, "
+        f"{json_bytes:,} B JSON / {len(body):,} B wire, {serialize_seconds * 1000:.1f} ms serialize, "
+        f"{upsert_seconds * 1000:.1f} ms upsert"
+    )
+
+
+def log_upsert_stats(table: str, stats: dict) -> None:
+    logger.info(
+        f"{table}: {stats['batches']} Batches, {stats['json_bytes']:,} B JSON → "
+        f"{stats['wire_bytes']:,} B übertragen, Serialisierung {stats['serialize_seconds'] * 1000:.1f} ms, "
+        f"Upsert {stats['upsert_seconds']:.2f} s"
+    )
+
+
+def _batch_upsert(client: Client, table: str, records: list[dict], on_conflict: str,
+                  columns: list[str], stats: dict = None) -> int:
+    dumps = get_serializer()
+    level = gzip_level()
+    own_stats = stats is None
+    stats = new_upsert_stats() if own_stats else stats
     for i in range(0, len(records), BATCH_SIZE):
-        batch = records[i:i + BATCH_SIZE]
-        client.table(table).upsert(batch, on_conflict=on_conflict).execute()
+        _upsert_batch(client, table, records[i:i + BATCH_SIZE], on_conflict, columns, dumps, level, stats)
+    if own_stats:
+        log_upsert_stats(table, stats)
+    return len(records)
+
+
+def _fetch_all(client: Client, table: str, columns: str,
+               where_in: tuple[str, list] = None) -> list[dict]:
+    """
+    Read all rows of a table via keyset pagination on id (no OFFSET scans),
+    optionally only rows whose column `where_in[0]` is in `where_in[1]`.
+    """
+    rows = []
+    last_id = 0
+    while True:
+        query = client.table(table).select(f"id,{columns}").gt("id", last_id)
+        if where_in is not None:
+            query = query.in_(*where_in)
+        page = query.order("id").limit(PAGE_SIZE).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        last_id = page[-1]["id"]
+
+
+def _fetch_matching(client: Client, table: str, columns: str, field: str, values) -> list[dict]:
+    """Rows whose `field` is one of `values`, looked up in chunks of LOOKUP_BATCH_SIZE."""
+    values = list(dict.fromkeys(values))
+    rows = []
+    for i in range(0, len(values), LOOKUP_BATCH_SIZE):
+        rows.extend(_fetch_all(client, table, columns, (field, values[i:i + LOOKUP_BATCH_SIZE])))
+    return rows
+
+
+def _batch_delete(client: Client, table: str, ids: list[int]) -> int:
+    total = 0
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[i:i + DELETE_BATCH_SIZE]
+        client.table(table).delete().in_("id", batch).execute()
         total += len(batch)
-        logger.debug(f"Batch {i // BATCH_SIZE + 1} → {table}: {len(batch)} records")
+        logger.debug(f"Delete-Batch {i // DELETE_BATCH_SIZE + 1} → {table}: {len(batch)} records")
     return total
 
 
-def upsert_dimensions(dimensions: list[dict]) -> int:
-    """Upsert parsed ad dimensions. One row per unique ad_name_raw."""
+OPTIONAL_DIMENSION_FIELDS = [
+    "pl_eg_sp", "color", "element", "cr_kuerzel", "creative_tag",
+    "format_video", "format_foto", "hook", "text_kuerzel", "visual",
+    "angle", "gender", "test_ids", "launch_year_week",
+    "original_creative_id", "additional_infos", "free_text",
+    "ad_group_number", "color_freitext_pl", "visual_ct",
+    "creator_cluster", "text_edit", "text_align", "image_type",
+    "copy_cluster", "zusatzfeld", "raw_suffix",
+]
+
+# Optionalfelder, die der Parser je Schema setzen kann (siehe parser._parse_schema_*)
+SCHEMA_DIMENSION_FIELDS = {
+    1: [
+        "pl_eg_sp", "color", "element", "cr_kuerzel", "creative_tag",
+        "format_video", "format_foto", "hook", "text_kuerzel", "visual",
+        "angle", "gender", "test_ids", "launch_year_week",
+        "original_creative_id", "additional_infos", "free_text",
+        "ad_group_number", "raw_suffix",
+    ],
+    2: [
+        "pl_eg_sp", "color", "test_ids", "visual_ct", "creator_cluster",
+        "gender", "text_edit", "text_align", "image_type", "copy_cluster",
+        "element", "launch_year_week", "original_creative_id",
+        "additional_infos", "zusatzfeld", "free_text", "ad_group_number",
+        "raw_suffix",
+    ],
+    3: ["pl_eg_sp", "test_ids", "raw_suffix"],
+}
+
+METRIC_FIELDS = [
+    "ad_name_raw", "company", "channels", "first_date", "last_date",
+    "revenue", "spend", "roas",
+]
+
+# Spalten, die _dimension_record immer setzt
+DIMENSION_BASE_FIELDS = [
+    "ad_name_raw", "schema_version", "product", "creative_id", "content_type",
+    "adtype", "creative_cluster", "in_ex", "creative_source", "is_ai", "parsed_at",
+]
+
+
+def _dimension_record(d: dict, now: str) -> dict:
+    record = {
+        "ad_name_raw":      d.get("ad_name_raw", ""),
+        "schema_version":   d.get("schema_version", 3),
+        "product":          d.get("product", ""),
+        "creative_id":      d.get("creative_id", ""),
+        "content_type":     d.get("content_type", ""),
+        "adtype":           d.get("adtype", ""),
+        "creative_cluster": d.get("creative_cluster", ""),
+        "in_ex":            d.get("in_ex", ""),
+        "creative_source":  d.get("creative_source", ""),
+        "is_ai":            d.get("is_ai", False),
+        "parsed_at":        now,
+    }
+
+    for field in OPTIONAL_DIMENSION_FIELDS:
+        val = d.get(field)
+        if val is not None and val != "":
+            record[field] = val
+
+    if d.get("parse_errors"):
+        record["parse_errors"] = d["parse_errors"]
+
+    return record
+
+
+def _metric_record(m: dict, now: str) -> dict:
+    return {
+        "ad_name_raw": m["ad_name_raw"],
+        "company":     m.get("company", ""),
+        "channels":    m.get("channels", ""),
+        "first_date":  str(m["first_date"]) if m.get("first_date") else None,
+        "last_date":   str(m["last_date"])  if m.get("last_date")  else None,
+        "revenue":     float(m["revenue"])  if m.get("revenue")  is not None else None,
+        "spend":       float(m["spend"])    if m.get("spend")    is not None else None,
+        "roas":        float(m["roas"])     if m.get("roas")     is not None else None,
+        "synced_at":   now,
+    }
+
+
+def dimension_signature(d: dict) -> tuple:
+    """
+    Column signature of a parsed dimension: schema_version plus the populated
+    optional fields outside that schema's column set. Records with equal
+    signatures share one column list (see dimension_columns).
+    """
+    schema = d.get("schema_version", 3)
+    expected = SCHEMA_DIMENSION_FIELDS.get(schema, OPTIONAL_DIMENSION_FIELDS)
+    extra = tuple(
+        f for f in OPTIONAL_DIMENSION_FIELDS
+        if f not in expected and d.get(f) is not None and d.get(f) != ""
+    )
+    return schema, extra
+
+
+def dimension_columns(signature: tuple) -> list[str]:
+    """
+    Optional columns upserted for a signature: the schema's set, extra
+    populated fields and parse_errors. Columns listed but missing from a
+    record are written as NULL, so emptied values are cleared.
+    """
+    schema, extra = signature
+    expected = SCHEMA_DIMENSION_FIELDS.get(schema, OPTIONAL_DIMENSION_FIELDS)
+    return [f for f in OPTIONAL_DIMENSION_FIELDS if f in expected or f in extra] + ["parse_errors"]
+
+
+def upsert_dimensions(dimensions: list[dict], stats: dict = None) -> int:
+    """
+    Upsert parsed ad dimensions. One row per unique ad_name_raw.
+
+    Records are grouped by dimension_signature. Each batch lists the
+    record's schema columns and parse_errors as PostgREST `columns`, while
+    the JSON only carries populated values; listed but missing columns are
+    set to NULL, so emptied values are cleared on conflict. Columns of other
+    schemas are not listed and left untouched.
+
+    With `stats` (see new_upsert_stats) the counters are aggregated there
+    instead of being logged per call.
+    """
     if not dimensions:
         return 0
 
     client = _get_client()
     now = datetime.now(timezone.utc).isoformat()
+    own_stats = stats is None
+    stats = new_upsert_stats() if own_stats else stats
 
-    records = []
+    groups: dict[tuple, list[dict]] = {}
     for d in dimensions:
-        record = {
-            "ad_name_raw":      d.get("ad_name_raw", ""),
-            "schema_version":   d.get("schema_version", 3),
-            "product":          d.get("product", ""),
-            "creative_id":      d.get("creative_id", ""),
-            "content_type":     d.get("content_type", ""),
-            "adtype":           d.get("adtype", ""),
-            "creative_cluster": d.get("creative_cluster", ""),
-            "in_ex":            d.get("in_ex", ""),
-            "creative_source":  d.get("creative_source", ""),
-            "is_ai":            d.get("is_ai", False),
-            "parsed_at":        now,
-        }
-
-        optional_fields = [
-            "pl_eg_sp", "color", "element", "cr_kuerzel", "creative_tag",
-            "format_video", "format_foto", "hook", "text_kuerzel", "visual",
-            "angle", "gender", "test_ids", "launch_year_week",
-            "original_creative_id", "additional_infos", "free_text",
-            "ad_group_number", "color_freitext_pl", "visual_ct",
-            "creator_cluster", "text_edit", "text_align", "image_type",
-            "copy_cluster", "zusatzfeld", "raw_suffix",
-        ]
-        for field in optional_fields:
-            val = d.get(field)
-            if val is not None and val != "":
-                record[field] = val
-
-        if d.get("parse_errors"):
-            record["parse_errors"] = d["parse_errors"]
-
-        records.append(record)
-
-    return _batch_upsert(client, "parsed_ad_dimensions", records, "ad_name_raw")
-
-
-def upsert_creative_metrics(metrics: list[dict]) -> int:
-    """Upsert creative-level metrics. One row per ad_name_raw + channels."""
+        groups.setdefault(dimension_signature(d), []).append(_dimension_record(d, now))
+
+    total = 0
+    for signature, records in groups.items():
+        # Feste Sortierung = feste Lock-Reihenfolge bei parallelen Backfill-Chunks
+        records.sort(key=lambda r: r["ad_name_raw"])
+        columns = DIMENSION_BASE_FIELDS + dimension_columns(signature)
+        total += _batch_upsert(client, "parsed_ad_dimensions", records, "ad_name_raw", columns, stats)
+
+    if own_stats:
+        log_upsert_stats("parsed_ad_dimensions", stats)
+    return total
+
+
+def upsert_creative_metrics(metrics: list[dict], stats: dict = None) -> int:
+    """Upsert creative-level metrics. One row per ad_name_raw + channels; `stats` as above."""
     if not metrics:
         return 0
 
     client = _get_client()
     now = datetime.now(timezone.utc).isoformat()
+    records = sorted(
+        (_metric_record(m, now) for m in metrics),
+        key=lambda r: (r["ad_name_raw"], r["channels"] or ""),
+    )
+
+    return _batch_upsert(client, "creative_metrics", records, "ad_name_raw,channels",
+                         [*METRIC_FIELDS, "synced_at"], stats)
+
+
+def _normalize(value):
+    # Leere Optionalfelder werden als NULL gesendet
+    if value == "" or value == []:
+        return None
+    return value
+
+
+def _same(value, stored_value) -> bool:
+    value, stored_value = _normalize(value), _normalize(stored_value)
+    # NUMERIC kann als int, Decimal oder String zurückkommen, gesendet wird float
+    if isinstance(value, float) and stored_value is not None and not isinstance(stored_value, bool):
+        try:
+            return value == float(stored_value)
+        except (TypeError, ValueError):
+            return False
+    return value == stored_value
+
+
+def _diff_outcome(record: dict, stored: dict, key_fields: tuple[str, ...],
+                  compare_fields: list[str]) -> tuple[tuple, str]:
+    """
+    Key and outcome ("insert", "update" or "unchanged") of one upsert record.
+    A compare field missing from the record counts as NULL, as in the upsert.
+    """
+    key = tuple(record.get(f) for f in key_fields)
+    existing = stored.get(key)
+    if existing is None:
+        return key, "insert"
+    if any(not _same(record.get(f), existing.get(f)) for f in compare_fields):
+        return key, "update"
+    return key, "unchanged"
+
+
+_DIMENSION_DIFF_BASE_FIELDS = [f for f in DIMENSION_BASE_FIELDS if f not in ("ad_name_raw", "parsed_at")]
+DIMENSION_COMPARE_FIELDS = [*_DIMENSION_DIFF_BASE_FIELDS, *OPTIONAL_DIMENSION_FIELDS, "parse_errors"]
+METRIC_COMPARE_FIELDS = [f for f in METRIC_FIELDS if f not in ("ad_name_raw", "channels")]
+
+
+def load_stored_dimensions(names: Iterable[str] = None) -> dict:
+    """Stored dimension rows keyed by (ad_name_raw,): all, or only those in `names`."""
+    client = _get_client()
+    columns = ",".join(["ad_name_raw", *DIMENSION_COMPARE_FIELDS])
+    if names is None:
+        rows = _fetch_all(client, "parsed_ad_dimensions", columns)
+    else:
+        rows = _fetch_matching(client, "parsed_ad_dimensions", columns, "ad_name_raw", names)
+    return {(r["ad_name_raw"],): r for r in rows}
 
-    records = []
-    for m in metrics:
-        records.append({
-            "ad_name_raw": m["ad_name_raw"],
-            "company":     m.get("company", ""),
-            "channels":    m.get("channels", ""),
-            "first_date":  str(m["first_date"]) if m.get("first_date") else None,
-            "last_date":   str(m["last_date"])  if m.get("last_date")  else None,
-            "revenue":     float(m["revenue"])  if m.get("revenue")  is not None else None,
-            "spend":       float(m["spend"])    if m.get("spend")    is not None else None,
-            "roas":        float(m["roas"])     if m.get("roas")     is not None else None,
-            "synced_at":   now,
-        })
 
-    return _batch_upsert(client, "creative_metrics", records, "ad_name_raw,channels")
+def load_stored_creative_metrics(names: Iterable[str] = None) -> dict:
+    """Stored metric rows keyed by (ad_name_raw, channels): all, or only those of `names`."""
+    client = _get_client()
+    columns = ",".join(METRIC_FIELDS)
+    if names is None:
+        rows = _fetch_all(client, "creative_metrics", columns)
+    else:
+        rows = _fetch_matching(client, "creative_metrics", columns, "ad_name_raw", names)
+    return {(r["ad_name_raw"], r["channels"]): r for r in rows}
+
+
+def diff_dimensions(dimensions: list[dict], stored: dict = None) -> dict:
+    """
+    Compare parsed dimensions with the stored rows without writing.
+    Returns {"insert": n, "update": n, "unchanged": n}; parsed_at is ignored.
+    Without `stored`, only the rows of the given ad names are loaded.
+    """
+    if stored is None:
+        stored = load_stored_dimensions(d["ad_name_raw"] for d in dimensions)
+    now = datetime.now(timezone.utc).isoformat()
+    counts = {"insert": 0, "update": 0, "unchanged": 0}
+    for d in dimensions:
+        # Genau die Spalten vergleichen, die der Upsert für diese Signatur listet
+        compare_fields = _DIMENSION_DIFF_BASE_FIELDS + dimension_columns(dimension_signature(d))
+        counts[_diff_outcome(_dimension_record(d, now), stored, ("ad_name_raw",), compare_fields)[1]] += 1
+    return counts
+
+
+def classify_creative_metrics(metrics: list[dict], stored: dict = None) -> dict[tuple, str]:
+    """
+    Outcome per (ad_name_raw, channels) without writing: "insert", "update" or
+    "unchanged"; synced_at is ignored. A key given twice counts as its last row,
+    like the upsert. Merge the results of several batches to count each key once.
+    Without `stored`, only the rows of the given ad names are loaded.
+    """
+    if stored is None:
+        stored = load_stored_creative_metrics(m["ad_name_raw"] for m in metrics)
+    now = datetime.now(timezone.utc).isoformat()
+    return dict(
+        _diff_outcome(_metric_record(m, now), stored, ("ad_name_raw", "channels"), METRIC_COMPARE_FIELDS)
+        for m in metrics
+    )
+
+
+def diff_creative_metrics(metrics: list[dict], stored: dict = None) -> dict:
+    """
+    Compare metrics with the stored rows without writing.
+    Returns {"insert": n, "update": n, "unchanged": n} with each key counted once.
+    """
+    counts = {"insert": 0, "update": 0, "unchanged": 0}
+    for outcome in classify_creative_metrics(metrics, stored).values():
+        counts[outcome] += 1
+    return counts
+
+
+def fetch_dimension_keys() -> dict[str, int]:
+    """Stored dimension keys: ad_name_raw → id."""
+    client = _get_client()
+    rows = _fetch_all(client, "parsed_ad_dimensions", "ad_name_raw")
+    return {r["ad_name_raw"]: r["id"] for r in rows}
+
+
+def fetch_creative_metric_keys() -> dict[tuple[str, str], int]:
+    """Stored metric keys: (ad_name_raw, channels) → id."""
+    client = _get_client()
+    rows = _fetch_all(client, "creative_metrics", "ad_name_raw,channels")
+    return {(r["ad_name_raw"], r["channels"]): r["id"] for r in rows}
+
+
+def delete_dimensions(ids: list[int]) -> int:
+    """Delete parsed ad dimensions by id, in batches."""
+    if not ids:
+        return 0
+    return _batch_delete(_get_client(), "parsed_ad_dimensions", ids)
+
+
+def delete_creative_metrics(ids: list[int]) -> int:
+    """Delete creative metrics by id, in batches."""
+    if not ids:
+        return 0
+    return _batch_delete(_get_client(), "creative_metrics", ids)
 
 
 def write_sync_log() -> int:
@@ -120,7 +477,7 @@ def write_sync_log() -> int:
 
 
 def update_sync_log(sync_id: int, status: str, rows_processed: int = 0,
-                    error_message: str = None, bq_bytes: int = 0):
+                    error_message: str = None, bq_bytes: int = 0, profile_path: str = None):
     client = _get_client()
     data = {
         "status":         status,
@@ -131,4 +488,6 @@ def update_sync_log(sync_id: int, status: str, rows_processed: int = 0,
         data["sync_completed_at"] = datetime.now(timezone.utc).isoformat()
     if error_message:
         data["error_message"] = error_message
+    if profile_path:
+        data["profile_path"] = profile_path
     client.table("etl_sync_log").update(data).eq("id", sync_id).execute()
@@ -86,5 +86,9 @@ CREATE TABLE etl_sync_log (
   status            TEXT        NOT NULL CHECK (status IN ('running', 'success', 'failed')),
   rows_processed    INTEGER     DEFAULT 0,
   bq_query_bytes    BIGINT      DEFAULT 0,
-  error_message     TEXT
+  error_message     TEXT,
+  profile_path      TEXT        -- pstats-Datei bei Runs mit Profiling
 );
+
+-- Migration bestehender Installationen:
+-- ALTER TABLE etl_sync_log ADD COLUMN profile_path TEXT;
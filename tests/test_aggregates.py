@@ -0,0 +1,110 @@
+"""
+Tests for the in-memory aggregate snapshot.
+
+Run with: pytest tests/test_aggregates.py -v
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import aggregates
+from aggregates import Snapshot, parse_group_by
+
+DIMENSIONS = {
+    ("A",): {"ad_name_raw": "A", "product": "Socken", "hook": "H1"},
+    ("B",): {"ad_name_raw": "B", "product": "Socken", "hook": "H2"},
+    ("C",): {"ad_name_raw": "C", "product": "Boxer", "hook": "H1"},
+}
+METRICS = [
+    {"ad_name_raw": "A", "channels": "Meta Ads", "company": "SNOCKS", "spend": 10.0, "revenue": 30.0},
+    {"ad_name_raw": "A", "channels": "Facebook", "company": "SNOCKS", "spend": 5.0, "revenue": 5.0},
+    {"ad_name_raw": "B", "channels": "Meta Ads", "company": "SNOCKS", "spend": 20.0, "revenue": 20.0},
+    {"ad_name_raw": "C", "channels": "Meta Ads", "company": "SNOCKS", "spend": 0.0, "revenue": None},
+    {"ad_name_raw": "X", "channels": "Meta Ads", "company": "SNOCKS", "spend": 99.0, "revenue": 1.0},
+]
+
+
+@pytest.fixture
+def snapshot():
+    return Snapshot.from_rows(DIMENSIONS, METRICS)
+
+
+class TestSnapshot:
+    def test_inner_join(self, snapshot):
+        assert snapshot.size == 4
+
+    def test_group_by_product(self, snapshot):
+        rows = snapshot.aggregate(("product",))
+
+        assert rows[0] == {"product": "Socken", "spend": 35.0, "revenue": 55.0, "roas": 1.5714, "creatives": 2}
+        assert rows[1] == {"product": "Boxer", "spend": 0.0, "revenue": 0.0, "roas": None, "creatives": 1}
+
+    def test_group_by_two_columns(self, snapshot):
+        rows = snapshot.aggregate(("product", "hook"))
+
+        assert {(r["product"], r["hook"]) for r in rows} == {("Socken", "H1"), ("Socken", "H2"), ("Boxer", "H1")}
+
+    def test_total_without_group_by(self, snapshot):
+        assert snapshot.aggregate(()) == [{"spend": 35.0, "revenue": 55.0, "roas": 1.5714, "creatives": 3}]
+
+    def test_cached_result(self, snapshot):
+        assert snapshot.aggregate(("hook",)) is snapshot.aggregate(("hook",))
+
+    def test_lru_eviction(self, snapshot, monkeypatch):
+        monkeypatch.setattr(aggregates, "CACHE_SIZE", 1)
+        first = snapshot.aggregate(("hook",))
+        snapshot.aggregate(("product",))
+
+        assert snapshot.aggregate(("hook",)) is not first
+
+
+class TestParseGroupBy:
+    def test_columns(self):
+        assert parse_group_by("product, hook") == ("product", "hook")
+        assert parse_group_by("") == ()
+
+    def test_unknown_column(self):
+        with pytest.raises(ValueError):
+            parse_group_by("product,spend")
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    loads = []
+
+    def load_stored_dimensions():
+        loads.append("dimensions")
+        time.sleep(0.05)  # langsamer Supabase-Read, damit sich Requests überlappen
+        return DIMENSIONS
+
+    monkeypatch.setattr(aggregates, "_snapshot", None)
+    monkeypatch.setattr(aggregates, "load_stored_dimensions", load_stored_dimensions)
+    monkeypatch.setattr(aggregates, "load_stored_creative_metrics",
+                        lambda: {(m["ad_name_raw"], m["channels"]): m for m in METRICS})
+    return loads
+
+
+class TestGetSnapshot:
+    def test_concurrent_cold_start_builds_once(self, stored):
+        snapshots = []
+        threads = [threading.Thread(target=lambda: snapshots.append(aggregates.get_snapshot())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert stored == ["dimensions"]
+        assert len({id(s) for s in snapshots}) == 1
+
+    def test_refresh_replaces_snapshot(self, stored):
+        first = aggregates.get_snapshot()
+        second = aggregates.refresh_snapshot()
+
+        assert second is not first
+        assert aggregates.get_snapshot() is second
+        assert stored == ["dimensions", "dimensions"]
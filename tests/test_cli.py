@@ -0,0 +1,79 @@
+"""
+Tests for the CLI: backfill chunking, argument checks and exit codes (run_etl is stubbed).
+
+Run with: pytest tests/test_cli.py -v
+"""
+
+import sys
+import os
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import cli
+from cli import date_chunks
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    calls = []
+
+    def run_etl(dry_run=False, date_from=None, date_to=None, profile=False):
+        calls.append((date_from, date_to))
+        if date_from == date(2024, 1, 11):
+            raise RuntimeError("BigQuery quota exceeded")
+        return {"status": "success", "rows_processed": 10}
+
+    monkeypatch.setattr(cli, "run_etl", run_etl)
+    return calls
+
+
+class TestDateChunks:
+    def test_half_open_chunks_with_short_last_chunk(self):
+        chunks = date_chunks(date(2024, 1, 1), date(2024, 1, 26), 10)
+
+        assert chunks == [
+            (date(2024, 1, 1), date(2024, 1, 11)),
+            (date(2024, 1, 11), date(2024, 1, 21)),
+            (date(2024, 1, 21), date(2024, 1, 26)),
+        ]
+
+    def test_empty_range(self):
+        assert date_chunks(date(2024, 1, 1), date(2024, 1, 1), 10) == []
+        assert date_chunks(date(2024, 2, 1), date(2024, 1, 1), 10) == []
+
+    def test_chunk_days_must_be_positive(self):
+        with pytest.raises(ValueError):
+            date_chunks(date(2024, 1, 1), date(2024, 2, 1), 0)
+
+
+class TestMain:
+    def test_to_requires_from(self, runs):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["--to", "2024-02-01"])
+
+        assert exc.value.code == 2
+        assert runs == []
+
+    def test_workers_must_be_positive(self, runs):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["--from", "2024-01-01", "--workers", "0"])
+
+        assert exc.value.code == 2
+        assert runs == []
+
+    def test_failed_chunk_fails_backfill(self, runs, capsys):
+        code = cli.main(["--from", "2024-01-01", "--to", "2024-01-26", "--chunk-days", "10", "--workers", "2"])
+
+        assert code == 1
+        assert len(runs) == 3
+        assert '"status": "failed"' in capsys.readouterr().out
+
+    def test_backfill_summary(self, runs):
+        result = cli.run_backfill(date(2024, 1, 21), date(2024, 2, 10), 10, workers=2)
+
+        assert result["status"] == "success"
+        assert result["chunks"] == 2
+        assert result["rows_processed"] == 20
+        assert [r["date_from"] for r in result["results"]] == ["2024-01-21", "2024-01-31"]
@@ -0,0 +1,75 @@
+"""
+Tests for the memory-budgeted dedup key store.
+
+Run with: pytest tests/test_dedup_store.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+from dedup_store import KeyStore
+
+
+@pytest.fixture(params=["memory", "spilled"])
+def store(request, tmp_path):
+    keys = KeyStore(memory_budget_bytes=None if request.param == "memory" else 1, spill_dir=str(tmp_path))
+    yield keys
+    keys.close()
+
+
+class TestKeyStore:
+    def test_first_decision_wins(self, store):
+        store.add_creative("A", True)
+        store.add_creative("B", False)
+        store.add_creative("A", False)
+
+        assert store.creative_allowed("A") is True
+        assert store.creative_allowed("B") is False
+        assert store.creative_allowed("C") is None
+        assert store.creative_count == 2
+
+    def test_dimension_names_only_allowed(self, store):
+        store.add_creative("A", True)
+        store.add_creative("B", False)
+        names = store.dimension_names()
+
+        assert "A" in names
+        assert "B" not in names
+        assert list(names) == ["A"]
+        assert len(names) == 1
+
+    def test_metric_keys_dedup_and_null_channel(self, store):
+        store.add_metric_keys([("A", "Meta Ads"), ("A", None), ("A", "Meta Ads")])
+        keys = store.metric_keys()
+
+        assert len(keys) == 2
+        assert ("A", None) in keys
+        assert ("A", "Facebook") not in keys
+        assert set(keys) == {("A", "Meta Ads"), ("A", None)}
+
+    def test_spill_moves_existing_keys(self, tmp_path):
+        with KeyStore(memory_budget_bytes=1000, spill_dir=str(tmp_path)) as store:
+            store.add_creative("A", True)
+            store.add_metric_keys([("A", "Meta Ads")])
+            store.set_metric_outcomes({("A", "Meta Ads"): "update"})
+            assert not store.spilled
+
+            for i in range(20):
+                store.add_creative(f"N{i}", False)
+
+            assert store.spilled
+            assert store.creative_allowed("A") is True
+            assert ("A", "Meta Ads") in store.metric_keys()
+            assert store.metric_outcome_counts() == {"update": 1}
+        assert list(tmp_path.iterdir()) == []
+
+    def test_metric_outcomes_last_write_wins(self, store):
+        store.add_metric_keys([("A", "Meta Ads"), ("A", None), ("B", "Meta Ads")])
+        store.set_metric_outcomes({("A", "Meta Ads"): "update", ("A", None): "insert"})
+        store.set_metric_outcomes({("A", "Meta Ads"): "unchanged"})
+
+        assert store.metric_outcome_counts() == {"unchanged": 1, "insert": 1}
+        assert len(store.metric_keys()) == 3
@@ -0,0 +1,107 @@
+"""
+Tests for the ETL run orchestration (BigQuery, pipeline and Supabase are stubbed).
+
+Run with: pytest tests/test_etl.py -v
+"""
+
+import sys
+import os
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import etl
+
+PIPELINE_RESULT = {
+    "rows": 3, "parse_errors": 0, "unique_creatives": 1,
+    "dimensions": {"records": 1}, "metrics": {"records": 1}, "stages": {},
+}
+
+
+@pytest.fixture
+def sync_log(monkeypatch):
+    updates = []
+
+    def update_sync_log(sync_id, status, profile_path=None, **kwargs):
+        # Festhalten, ob die Datei zum Zeitpunkt des Log-Updates schon existiert
+        exists = profile_path is not None and os.path.exists(profile_path)
+        updates.append({"status": status, "profile_path": profile_path, "exists": exists})
+
+    monkeypatch.setattr(etl, "write_sync_log", lambda: 42)
+    monkeypatch.setattr(etl, "update_sync_log", update_sync_log)
+    monkeypatch.setattr(etl, "fetch_ads_pages", lambda date_from, date_to: (iter([]), 100))
+    monkeypatch.setattr(etl, "run_pipeline", lambda pages, keys, dry_run, profile: dict(PIPELINE_RESULT))
+    monkeypatch.setattr(etl, "reconcile_deletions", lambda *args, **kwargs: dict(etl.NO_DELETIONS))
+    return updates
+
+
+class TestReconciliation:
+    @pytest.fixture
+    def reconciled(self, sync_log, monkeypatch):
+        calls = []
+
+        def reconcile_deletions(dimension_names, metric_keys, dry_run=False):
+            calls.append(dry_run)
+            return {"dimensions_deleted": 1, "metrics_deleted": 2}
+
+        monkeypatch.setattr(etl, "reconcile_deletions", reconcile_deletions)
+        return calls
+
+    def test_full_run_reconciles(self, reconciled):
+        result = etl.run_etl()
+
+        assert reconciled == [False]
+        assert result["dimensions_deleted"] == 1
+        assert result["metrics_deleted"] == 2
+
+    @pytest.mark.parametrize("date_from, date_to", [
+        (date(2024, 1, 1), None),
+        (None, date(2024, 2, 1)),
+    ])
+    def test_partial_run_skips(self, reconciled, date_from, date_to):
+        result = etl.run_etl(date_from=date_from, date_to=date_to)
+
+        assert reconciled == []
+        assert result["dimensions_deleted"] == result["metrics_deleted"] == 0
+
+    def test_empty_run_skips(self, reconciled, monkeypatch):
+        monkeypatch.setattr(etl, "run_pipeline", lambda pages, keys, dry_run, profile: {**PIPELINE_RESULT, "rows": 0})
+
+        result = etl.run_etl()
+
+        assert reconciled == []
+        assert result["dimensions_deleted"] == result["metrics_deleted"] == 0
+
+
+class TestProfiling:
+    def test_profile_written_before_sync_log(self, sync_log, monkeypatch, tmp_path):
+        monkeypatch.setattr(etl, "profile_path", lambda sync_id: str(tmp_path / "run.prof"))
+
+        result = etl.run_etl(profile=True)
+
+        assert result["profile_path"] == str(tmp_path / "run.prof")
+        assert sync_log == [{"status": "success", "profile_path": result["profile_path"], "exists": True}]
+
+    def test_failed_dump_keeps_run_successful(self, sync_log, monkeypatch, tmp_path):
+        (tmp_path / "file").write_text("")
+        monkeypatch.setattr(etl, "profile_path", lambda sync_id: str(tmp_path / "file" / "run.prof"))
+
+        result = etl.run_etl(profile=True)
+
+        assert result["status"] == "success"
+        assert result["profile_path"] is None
+        assert sync_log == [{"status": "success", "profile_path": None, "exists": False}]
+
+    def test_failed_run_logs_written_profile(self, sync_log, monkeypatch, tmp_path):
+        monkeypatch.setattr(etl, "profile_path", lambda sync_id: str(tmp_path / "run.prof"))
+
+        def run_pipeline(pages, keys, dry_run, profile):
+            raise RuntimeError("Supabase down")
+
+        monkeypatch.setattr(etl, "run_pipeline", run_pipeline)
+
+        with pytest.raises(RuntimeError, match="Supabase down"):
+            etl.run_etl(profile=True)
+
+        assert sync_log == [{"status": "failed", "profile_path": str(tmp_path / "run.prof"), "exists": True}]
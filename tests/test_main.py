@@ -0,0 +1,107 @@
+"""
+Tests for the HTTP handlers (run_etl and the Supabase reads are stubbed).
+
+Run with: pytest tests/test_main.py -v
+"""
+
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+pytest.importorskip("flask")
+
+import aggregates
+import main
+
+DIMENSIONS = {
+    ("A",): {"ad_name_raw": "A", "product": "Socken"},
+    ("B",): {"ad_name_raw": "B", "product": "Boxer"},
+}
+METRICS = {
+    ("A", "Meta Ads"): {"ad_name_raw": "A", "channels": "Meta Ads", "company": "SNOCKS", "spend": 10.0, "revenue": 30.0},
+    ("B", "Meta Ads"): {"ad_name_raw": "B", "channels": "Meta Ads", "company": "SNOCKS", "spend": 5.0, "revenue": 5.0},
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    warmed_up = threading.Event()
+    warmed_up.set()  # kein Client-Warm-up im Test
+    monkeypatch.setattr(main, "_warm_up_started", warmed_up)
+    monkeypatch.setattr(aggregates, "_snapshot", None)
+    return main.app.test_client()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+
+    def load_stored_dimensions():
+        calls.append("dimensions")
+        return DIMENSIONS
+
+    monkeypatch.setattr(aggregates, "load_stored_dimensions", load_stored_dimensions)
+    monkeypatch.setattr(aggregates, "load_stored_creative_metrics", lambda: METRICS)
+    return calls
+
+
+class TestAggregates:
+    def test_group_by(self, client, loads):
+        response = client.get("/aggregates?group_by=product")
+
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body["group_by"] == ["product"]
+        assert [(r["product"], r["spend"]) for r in body["rows"]] == [("Socken", 10.0), ("Boxer", 5.0)]
+
+        client.get("/aggregates?group_by=product")
+        assert loads == ["dimensions"]
+
+    def test_unknown_column(self, client, loads):
+        response = client.get("/aggregates?group_by=nope")
+
+        assert response.status_code == 400
+        assert loads == []
+
+    def test_snapshot_unavailable(self, client, monkeypatch):
+        def load_stored_dimensions():
+            raise RuntimeError("Supabase down")
+
+        monkeypatch.setattr(aggregates, "load_stored_dimensions", load_stored_dimensions)
+
+        assert client.get("/aggregates").status_code == 503
+
+
+class TestTrigger:
+    def test_sync_refreshes_snapshot(self, client, loads, monkeypatch):
+        monkeypatch.setattr(main, "run_etl", lambda dry_run, profile: {"status": "success"})
+        client.get("/aggregates")
+
+        response = client.post("/")
+
+        assert response.status_code == 200
+        assert loads == ["dimensions", "dimensions"]
+
+    def test_dry_run_keeps_snapshot(self, client, loads, monkeypatch):
+        monkeypatch.setattr(main, "run_etl", lambda dry_run, profile: {"status": "dry_run"})
+        client.get("/aggregates")
+
+        response = client.post("/?dry_run=true")
+
+        assert response.status_code == 200
+        assert loads == ["dimensions"]
+
+    def test_failed_sync(self, client, loads, monkeypatch):
+        def run_etl(dry_run, profile):
+            raise RuntimeError("BigQuery down")
+
+        monkeypatch.setattr(main, "run_etl", run_etl)
+
+        response = client.post("/")
+
+        assert response.status_code == 500
+        assert response.get_json() == {"status": "failed", "error": "BigQuery down"}
+        assert loads == []
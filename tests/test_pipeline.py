@@ -0,0 +1,150 @@
+"""
+Tests for the staged fetch/parse/write pipeline (Supabase writes are captured).
+
+Run with: pytest tests/test_pipeline.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import pipeline
+import supabase_client
+from dedup_store import KeyStore
+from supabase_client import dimension_signature
+
+CT_AD = "Socken_C100_Image_Statics_Product_Ex_CreativeTeam_PL-SOC"
+CT_AD_2 = "Boxer_C101_Video_UGC_Head_In_CreativeTeam"
+OTHER_AD = "Socken_C042_Video_UGC_Testimonial_In_CFC"
+
+
+def _row(ad_name, channels="Meta Ads", spend=1.0):
+    return {"ad_names": ad_name, "channels": channels, "company": "SNOCKS", "spend": spend,
+            "revenue": 2.0, "roas": 2.0, "first_date": None, "last_date": None}
+
+
+@pytest.fixture
+def written(monkeypatch):
+    captured = {"dimensions": [], "metrics": []}
+
+    def upsert_dimensions(batch, stats):
+        captured["dimensions"].append(list(batch))
+        stats["records"] += len(batch)
+        return len(batch)
+
+    def upsert_creative_metrics(batch, stats):
+        captured["metrics"].append(list(batch))
+        stats["records"] += len(batch)
+        return len(batch)
+
+    monkeypatch.setattr(pipeline, "upsert_dimensions", upsert_dimensions)
+    monkeypatch.setattr(pipeline, "upsert_creative_metrics", upsert_creative_metrics)
+    monkeypatch.setattr(pipeline, "log_upsert_stats", lambda table, stats: None)
+    return captured
+
+
+class TestRunPipeline:
+    def test_filter_and_dedup(self, written):
+        pages = [
+            [_row(CT_AD, spend=1.0), _row(OTHER_AD)],
+            [_row(CT_AD, spend=5.0), _row(CT_AD, channels="Facebook"), _row(CT_AD_2)],
+        ]
+        keys = KeyStore()
+        result = pipeline.run_pipeline(iter(pages), keys)
+
+        assert result["rows"] == 5
+        assert result["unique_creatives"] == 3
+        assert set(keys.dimension_names()) == {CT_AD, CT_AD_2}
+        assert set(keys.metric_keys()) == {(CT_AD, "Meta Ads"), (CT_AD, "Facebook"), (CT_AD_2, "Meta Ads")}
+
+        dims = [d["ad_name_raw"] for batch in written["dimensions"] for d in batch]
+        assert sorted(dims) == sorted([CT_AD, CT_AD_2])
+
+        # letzte Zeile pro (ad_name_raw, channels) gewinnt
+        metrics = {(m["ad_name_raw"], m["channels"]): m for batch in written["metrics"] for m in batch}
+        assert metrics[(CT_AD, "Meta Ads")]["spend"] == 5.0
+        assert result["metrics"]["records"] == 3
+
+    def test_batches_are_bounded_and_unique(self, written, monkeypatch):
+        monkeypatch.setattr(pipeline, "BATCH_SIZE", 2)
+        pages = [[_row(f"P_C{i}_Image_S_P_Ex_CreativeTeam") for i in range(5)] for _ in range(3)]
+        result = pipeline.run_pipeline(iter(pages), KeyStore())
+
+        assert result["dimensions"]["records"] == 5
+        for batch in written["metrics"]:
+            keys = [(m["ad_name_raw"], m["channels"]) for m in batch]
+            assert len(batch) <= 2
+            assert len(keys) == len(set(keys))
+
+    def test_stage_failure_propagates(self, written):
+        def pages():
+            yield [_row(CT_AD)]
+            raise RuntimeError("BigQuery page failed")
+
+        with pytest.raises(RuntimeError, match="BigQuery page failed"):
+            pipeline.run_pipeline(pages(), KeyStore())
+
+    def test_stage_timings_reported(self, written):
+        result = pipeline.run_pipeline(iter([[_row(CT_AD)]]), KeyStore())
+
+        assert set(result["stages"]) == {"reader", "parser", "dimension_writer", "metric_writer"}
+        assert all(t["busy_s"] >= 0 for t in result["stages"].values())
+
+    def test_spilled_store_keeps_semantics(self, written, tmp_path):
+        pages = [[_row(f"P_C{i}_Image_S_P_Ex_CreativeTeam", spend=i) for i in range(50)] for _ in range(2)]
+        with KeyStore(memory_budget_bytes=1024, spill_dir=str(tmp_path)) as keys:
+            result = pipeline.run_pipeline(iter(pages), keys)
+
+            assert keys.spilled
+            assert result["unique_creatives"] == 50
+            assert len(keys.dimension_names()) == 50
+            assert len(keys.metric_keys()) == 50
+        assert sum(len(batch) for batch in written["dimensions"]) == 50
+
+    def test_dimension_batches_are_homogeneous(self, written, monkeypatch):
+        monkeypatch.setattr(pipeline, "BATCH_SIZE", 2)
+        pages = [[
+            _row("P_C1_Image_S_P_Ex_CreativeTeam_PL-SOC"),
+            _row("P_C2_Image_S_P_Ex_CreativeTeam"),
+            _row("P_C3_Image_S_P_Ex_CreativeTeam_PL-SOC"),
+            _row("P_C4_Image_S_P_Ex_CreativeTeam_PL-SOC_T01"),
+            _row("P_C5_Image_S_P_Ex_CreativeTeam"),
+        ]]
+        pipeline.run_pipeline(iter(pages), KeyStore())
+
+        assert sum(len(batch) for batch in written["dimensions"]) == 5
+        for batch in written["dimensions"]:
+            assert len({dimension_signature(d) for d in batch}) == 1
+
+    @pytest.mark.parametrize("budget", [None, 1])
+    def test_dry_run_counts_each_metric_key_once(self, monkeypatch, tmp_path, budget):
+        stored_metrics = {
+            (CT_AD, "Meta Ads"): {"ad_name_raw": CT_AD, "channels": "Meta Ads", "company": "SNOCKS",
+                                  "first_date": None, "last_date": None,
+                                  "revenue": 2.0, "spend": 5.0, "roas": 2.0},
+        }
+        lookups = []
+
+        def load_stored_creative_metrics(names):
+            names = set(names)
+            lookups.append(names)
+            return {key: row for key, row in stored_metrics.items() if key[0] in names}
+
+        monkeypatch.setattr(pipeline, "BATCH_SIZE", 2)
+        monkeypatch.setattr(supabase_client, "load_stored_dimensions", lambda names: {})
+        monkeypatch.setattr(supabase_client, "load_stored_creative_metrics", load_stored_creative_metrics)
+        # (CT_AD, "Meta Ads") landet in drei Batches, die letzte Zeile entspricht dem Stand
+        pages = [
+            [_row(CT_AD, spend=1.0), _row(CT_AD_2)],
+            [_row(CT_AD, spend=2.0), _row(CT_AD, channels="Facebook")],
+            [_row(CT_AD, spend=5.0)],
+        ]
+        with KeyStore(memory_budget_bytes=budget, spill_dir=str(tmp_path)) as keys:
+            result = pipeline.run_pipeline(iter(pages), keys, dry_run=True)
+
+        assert result["metrics"] == {"insert": 2, "update": 0, "unchanged": 1}
+        assert sum(result["dimensions"].values()) == 2
+        # Nur die Keys des jeweiligen Batches werden nachgeschlagen, nie die ganze Tabelle
+        assert all(names <= {CT_AD, CT_AD_2} and len(names) <= 2 for names in lookups)
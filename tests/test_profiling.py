@@ -0,0 +1,72 @@
+"""
+Tests for opt-in ETL profiling.
+
+Run with: pytest tests/test_profiling.py -v
+"""
+
+import pstats
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from parser import parse_ad_name
+from profiling import ProfileSession, profile_path, profiling_enabled
+
+
+def _parse_many():
+    for _ in range(10):
+        parse_ad_name("Socken_C042_Video_UGC_Testimonial_In_CFC_PL-SOC_Blau")
+
+
+class TestProfileSession:
+    def test_writes_pstats_with_thread_calls(self, tmp_path):
+        session = ProfileSession(str(tmp_path / "run.prof"))
+        session.start()
+        thread = threading.Thread(target=session.wrap(_parse_many))
+        thread.start()
+        thread.join()
+        session.stop()
+
+        stats = pstats.Stats(session.path)
+        functions = {name for _, _, name in stats.stats}
+        assert "parse_ad_name" in functions
+
+    def test_stop_without_start_writes_nothing(self, tmp_path):
+        session = ProfileSession(str(tmp_path / "run.prof"))
+
+        assert session.stop() is None
+        assert not os.path.exists(session.path)
+
+    def test_stop_is_idempotent(self, tmp_path):
+        session = ProfileSession(str(tmp_path / "run.prof"))
+        session.start()
+
+        assert session.stop() == session.path
+        assert session.stop() == session.path
+
+    def test_failed_dump_is_a_warning(self, tmp_path, caplog):
+        (tmp_path / "file").write_text("")
+        session = ProfileSession(str(tmp_path / "file" / "run.prof"))
+        session.start()
+        _parse_many()
+
+        assert session.stop() is None
+        assert session.stop() is None
+        assert "Profil konnte nicht geschrieben werden" in caplog.text
+
+
+class TestConfig:
+    def test_env_flag(self, monkeypatch):
+        monkeypatch.delenv("ETL_PROFILE", raising=False)
+        assert not profiling_enabled()
+        monkeypatch.setenv("ETL_PROFILE", "1")
+        assert profiling_enabled()
+
+    def test_profile_path(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("ETL_PROFILE_DIR", str(tmp_path))
+        path = profile_path(42)
+
+        assert path.startswith(str(tmp_path))
+        assert os.path.basename(path).startswith("etl-42-")
+        assert path.endswith(".prof")
@@ -0,0 +1,81 @@
+"""
+Tests for reconciliation of stale rows (Supabase reads and deletes are stubbed).
+
+Run with: pytest tests/test_reconcile.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import reconcile
+from dedup_store import KeyStore
+from reconcile import reconcile_deletions, stale_ids
+
+STORED_DIMENSIONS = {"A": 1, "B": 2, "C": 3, "D": 4}
+STORED_METRICS = {("A", "Meta Ads"): 11, ("A", None): 12, ("B", "Meta Ads"): 13, ("C", "Meta Ads"): 14}
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    deleted = {"dimensions": [], "metrics": []}
+
+    def delete_dimensions(ids):
+        deleted["dimensions"].extend(ids)
+        return len(ids)
+
+    def delete_creative_metrics(ids):
+        deleted["metrics"].extend(ids)
+        return len(ids)
+
+    monkeypatch.setattr(reconcile, "fetch_dimension_keys", lambda: dict(STORED_DIMENSIONS))
+    monkeypatch.setattr(reconcile, "fetch_creative_metric_keys", lambda: dict(STORED_METRICS))
+    monkeypatch.setattr(reconcile, "delete_dimensions", delete_dimensions)
+    monkeypatch.setattr(reconcile, "delete_creative_metrics", delete_creative_metrics)
+    return deleted
+
+
+def _keys(names, metric_keys, **kwargs) -> KeyStore:
+    keys = KeyStore(**kwargs)
+    for name in names:
+        keys.add_creative(name, True)
+    keys.add_metric_keys(metric_keys)
+    return keys
+
+
+class TestStaleIds:
+    def test_set_and_iterable(self):
+        assert stale_ids(STORED_DIMENSIONS, {"A", "C"}) == [2, 4]
+        assert stale_ids(STORED_DIMENSIONS, iter(["A", "C"])) == [2, 4]
+
+    def test_key_view_with_null_channels(self, tmp_path):
+        metric_keys = [("A", "Meta Ads"), ("A", None), ("C", "Meta Ads")]
+        in_memory = _keys(["A", "C"], metric_keys)
+        with _keys(["A", "C"], metric_keys, memory_budget_bytes=1, spill_dir=str(tmp_path)) as spilled:
+            assert spilled.spilled
+            for keys in (in_memory, spilled):
+                assert stale_ids(STORED_METRICS, keys.metric_keys()) == [13]
+                assert stale_ids(STORED_DIMENSIONS, keys.dimension_names()) == [2, 4]
+
+
+class TestReconcileDeletions:
+    def test_deletes_stale_rows(self, tables):
+        result = reconcile_deletions(["A", "B", "C"], [("A", "Meta Ads"), ("A", None), ("B", "Meta Ads")])
+
+        assert result == {"dimensions_deleted": 1, "metrics_deleted": 1}
+        assert tables == {"dimensions": [4], "metrics": [14]}
+
+    def test_dry_run_deletes_nothing(self, tables):
+        result = reconcile_deletions(["A", "B", "C"], [("A", "Meta Ads"), ("C", "Meta Ads")], dry_run=True)
+
+        assert result == {"dimensions_deleted": 1, "metrics_deleted": 2}
+        assert tables == {"dimensions": [], "metrics": []}
+
+    def test_guard_skips_mass_deletion(self, tables):
+        # 3 von 4 Dimension-Zeilen wären weg (> MAX_DELETE_FRACTION), Metriken nur 2 von 4
+        result = reconcile_deletions(["A"], [("A", "Meta Ads"), ("A", None)])
+
+        assert result == {"dimensions_deleted": 0, "metrics_deleted": 2}
+        assert tables == {"dimensions": [], "metrics": [13, 14]}
@@ -0,0 +1,51 @@
+"""
+Tests for the upsert payload serializer.
+
+Run with: pytest tests/test_serializer.py -v
+"""
+
+import gzip
+import json
+import sys
+import os
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+from serializer import SERIALIZERS, encode_body, get_serializer
+
+RECORDS = [
+    {"ad_name_raw": "Socken_C042_Video_UGC_Testimonial_In_CreativeTeam", "revenue": 12.5,
+     "first_date": date(2025, 3, 1), "parse_errors": ["x"], "is_ai": False},
+    {"ad_name_raw": "Ümlaut_C043", "revenue": None, "first_date": None, "parse_errors": [], "is_ai": True},
+]
+
+
+class TestSerializers:
+    @pytest.mark.parametrize("name", sorted(SERIALIZERS))
+    def test_roundtrip(self, name):
+        body = SERIALIZERS[name](RECORDS)
+
+        assert isinstance(body, bytes)
+        decoded = json.loads(body)
+        assert decoded[0]["first_date"] == "2025-03-01"
+        assert decoded[1]["ad_name_raw"] == "Ümlaut_C043"
+
+    def test_unknown_serializer(self):
+        with pytest.raises(ValueError):
+            get_serializer("yaml")
+
+    def test_gzip_body(self):
+        dumps = get_serializer("json")
+        body, raw_size = encode_body(RECORDS, dumps, level=6)
+
+        assert gzip.decompress(body) == dumps(RECORDS)
+        assert raw_size == len(dumps(RECORDS))
+
+    def test_no_compression(self):
+        dumps = get_serializer("json")
+        body, raw_size = encode_body(RECORDS, dumps)
+
+        assert body == dumps(RECORDS)
+        assert raw_size == len(body)
@@ -0,0 +1,54 @@
+"""
+Cold-start guard: neither the service nor its modules may import the heavy SDKs at import time.
+
+Run with: pytest tests/test_startup.py -v
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+BENCHMARK = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "startup.py")
+
+
+def _imported_modules(statement: str) -> set[str]:
+    probe = f"import sys\n{statement}\nprint('\\n'.join(sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": SRC_DIR},
+    )
+    return set(proc.stdout.split())
+
+
+class TestLazyImports:
+    def test_client_modules_do_not_import_sdks(self):
+        modules = _imported_modules("import bigquery_client, supabase_client, reconcile")
+
+        assert "google.cloud.bigquery" not in modules
+        assert "supabase" not in modules
+
+    def test_etl_modules_do_not_import_sdks(self):
+        modules = _imported_modules("import etl, cli, aggregates")
+
+        assert "google.cloud.bigquery" not in modules
+        assert "supabase" not in modules
+
+    def test_main_does_not_import_sdks(self):
+        pytest.importorskip("flask")
+        modules = _imported_modules("import main")
+
+        assert "google.cloud.bigquery" not in modules
+        assert "supabase" not in modules
+
+
+class TestStartupBenchmark:
+    def test_benchmark_passes(self):
+        pytest.importorskip("flask")
+        proc = subprocess.run([sys.executable, BENCHMARK, "--top", "5"], capture_output=True, text=True)
+
+        assert proc.returncode == 0, proc.stderr
+        assert "/health nach" in proc.stdout
@@ -0,0 +1,269 @@
+"""
+Tests for record building and batching in the Supabase client (no network).
+
+Run with: pytest tests/test_supabase_client.py -v
+"""
+
+import json
+import sys
+import os
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import supabase_client
+from parser import parse_ad_name
+from serializer import get_serializer
+from supabase_client import dimension_signature, diff_creative_metrics, diff_dimensions, upsert_dimensions
+
+AD_NAMES = [
+    "Socken_C042_Video_UGC_Testimonial_In_CFC_PL-SOC_Blau_EL1_CR01_SummerSale_916_H1_T1_V1",
+    "Socken_C100_Image_Statics_Product_Ex_MT_PL-SOC-Rot_T01_VC1_CC1_F_TE1_TA1",
+    "Socken_C101_Image_Statics_Product_Ex_MT_PL-SOC-Rot_T02_VC2_CC2_M_TE2_TA2",
+    "Retro_C200_Video_Motion_Lifestyle_In_NewAgency_EG_T01",
+    "Socken_C042",
+]
+
+
+def _dimensions():
+    dims = []
+    for name in AD_NAMES:
+        parsed = parse_ad_name(name)
+        parsed["ad_name_raw"] = name
+        dims.append(parsed)
+    return dims
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    sent = []
+
+    def upsert_batch(client, table, batch, on_conflict, columns, dumps, level, stats):
+        sent.append((columns, batch))
+        stats["records"] += len(batch)
+
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: object())
+    monkeypatch.setattr(supabase_client, "_upsert_batch", upsert_batch)
+    return sent
+
+
+class TestUpsertDimensions:
+    def test_batches_list_schema_columns(self, batches):
+        assert upsert_dimensions(_dimensions()) == len(AD_NAMES)
+
+        assert sum(len(batch) for _, batch in batches) == len(AD_NAMES)
+        for columns, batch in batches:
+            schema = batch[0]["schema_version"]
+            assert set(supabase_client.SCHEMA_DIMENSION_FIELDS[schema]) <= set(columns)
+            assert "parse_errors" in columns
+            assert all(set(record) <= set(columns) for record in batch)
+
+    def test_payload_keeps_baseline_record_shape(self, batches):
+        dims = _dimensions() * 100
+        for i, d in enumerate(dims):
+            d["ad_name_raw"] = f"{d['ad_name_raw']}_{i:03d}"
+        upsert_dimensions(dims)
+
+        dumps = get_serializer()
+        now = "2024-01-01T00:00:00.000000+00:00"
+        baseline = [supabase_client._dimension_record(d, now) for d in dims]
+        sent = [record for _, batch in batches for record in batch]
+        for record in sent:
+            record["parsed_at"] = now
+
+        assert sorted(sent, key=lambda r: r["ad_name_raw"]) == sorted(baseline, key=lambda r: r["ad_name_raw"])
+        assert len(dumps(sent)) == len(dumps(baseline))
+
+    def test_same_signature_shares_batch(self, batches):
+        upsert_dimensions(_dimensions())
+
+        assert len(batches) == len({dimension_signature(d) for d in _dimensions()})
+        assert len(batches) == 3
+
+    def test_signature_separates_schema_versions(self):
+        schema_1, schema_2 = _dimensions()[:2]
+
+        assert dimension_signature(schema_1) == (1, ())
+        assert dimension_signature(schema_2) == (2, ())
+
+    def test_emptied_fields_are_listed_for_null(self, batches):
+        dimension = _dimensions()[0]
+        dimension["hook"] = ""
+        dimension["parse_errors"] = []
+
+        upsert_dimensions([dimension])
+
+        columns, [record] = batches[0]
+        assert "hook" in columns and "hook" not in record
+        assert "parse_errors" in columns and "parse_errors" not in record
+        assert "visual_ct" not in columns
+
+    def test_diff_matches_upserted_columns(self, batches):
+        dims = _dimensions()
+        upsert_dimensions(dims)
+        # Stand nach dem Upsert: gelistete, aber fehlende Spalten sind NULL
+        stored = {
+            (r["ad_name_raw"],): {c: r.get(c) for c in columns}
+            for columns, batch in batches for r in batch
+        }
+
+        assert diff_dimensions(dims, stored) == {"insert": 0, "update": 0, "unchanged": len(dims)}
+
+
+class _Session:
+    """Stand-in for client.postgrest.session that answers every POST with one response."""
+
+    def __init__(self, status_code=201, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.requests = []
+
+    def post(self, url, params, headers, content):
+        self.requests.append({"url": url, "params": params, "headers": headers, "content": content})
+        return SimpleNamespace(status_code=self.status_code, text=self.text,
+                               is_error=self.status_code >= 400)
+
+
+def _client(session):
+    return SimpleNamespace(postgrest=SimpleNamespace(session=session))
+
+
+class TestUpsertBatch:
+    BATCH = [{"ad_name_raw": "A", "spend": 1.5}, {"ad_name_raw": "B"}]
+
+    def test_posts_serialized_batch(self):
+        session = _Session()
+        stats = supabase_client.new_upsert_stats()
+
+        supabase_client._upsert_batch(_client(session), "creative_metrics", self.BATCH, "ad_name_raw",
+                                      ["ad_name_raw", "spend"], get_serializer("json"), 0, stats)
+
+        [req] = session.requests
+        assert req["url"] == "/creative_metrics"
+        assert req["params"] == {"on_conflict": "ad_name_raw", "columns": "ad_name_raw,spend"}
+        assert req["headers"]["Prefer"] == "resolution=merge-duplicates,return=minimal"
+        assert json.loads(req["content"]) == self.BATCH
+        assert stats["batches"] == 1 and stats["records"] == 2
+
+    def test_error_carries_postgrest_body(self):
+        body = '{"code":"42703","message":"column \\"hook\\" does not exist","details":null,"hint":null}'
+        session = _Session(status_code=400, text=body)
+        stats = supabase_client.new_upsert_stats()
+
+        with pytest.raises(supabase_client.UpsertError, match="does not exist") as exc:
+            supabase_client._upsert_batch(_client(session), "parsed_ad_dimensions", self.BATCH, "ad_name_raw",
+                                          ["ad_name_raw", "hook"], get_serializer("json"), 0, stats)
+
+        assert exc.value.status_code == 400
+        assert "42703" in str(exc.value)
+        assert stats["batches"] == 0
+
+
+class _Query:
+    """Minimal PostgREST query builder stand-in answering in_() filters from `rows`."""
+
+    def __init__(self, rows, filters):
+        self.rows = rows
+        self.filters = filters
+        self.names = None
+        self.last_id = 0
+
+    def select(self, columns):
+        return self
+
+    def gt(self, field, value):
+        self.last_id = value
+        return self
+
+    def in_(self, field, values):
+        self.filters.append(list(values))
+        self.names = set(values)
+        return self
+
+    def order(self, field):
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def execute(self):
+        data = [r for r in self.rows if r["id"] > self.last_id
+                and (self.names is None or r["ad_name_raw"] in self.names)][:self.n]
+        return SimpleNamespace(data=data)
+
+
+class TestLoadStored:
+    def test_lookup_by_names_in_chunks(self, monkeypatch):
+        rows = [{"id": i + 1, "ad_name_raw": f"N{i // 2}", "channels": "Meta Ads" if i % 2 else "Facebook"}
+                for i in range(600)]
+        filters = []
+        client = SimpleNamespace(table=lambda table: _Query(rows, filters))
+        monkeypatch.setattr(supabase_client, "_get_client", lambda: client)
+        names = [f"N{i}" for i in range(250)] + ["N0", "missing"]
+
+        stored = supabase_client.load_stored_creative_metrics(names)
+
+        assert len(stored) == 500
+        assert ("N249", "Meta Ads") in stored and ("N250", "Meta Ads") not in stored
+        assert [len(f) for f in filters] == [100, 100, 51]
+
+
+def _metric(**overrides):
+    metric = {"ad_name_raw": AD_NAMES[0], "company": "SNOCKS", "channels": "Meta Ads",
+              "first_date": date(2024, 1, 1), "last_date": date(2024, 1, 31),
+              "revenue": 200.5, "spend": 100.0, "roas": 2.005}
+    metric.update(overrides)
+    return metric
+
+
+def _stored_metric(**overrides):
+    # So wie PostgREST die Zeile liefert: DATE als String, NUMERIC als Zahl
+    row = {"ad_name_raw": AD_NAMES[0], "company": "SNOCKS", "channels": "Meta Ads",
+           "first_date": "2024-01-01", "last_date": "2024-01-31",
+           "revenue": 200.5, "spend": 100, "roas": 2.005}
+    row.update(overrides)
+    return {(row["ad_name_raw"], row["channels"]): row}
+
+
+class TestDiff:
+    def test_insert_update_unchanged(self):
+        stored = {**_stored_metric(), **_stored_metric(channels="Facebook", spend=50)}
+        metrics = [_metric(), _metric(channels="Facebook"), _metric(channels="Instagram")]
+
+        assert diff_creative_metrics(metrics, stored) == {"insert": 1, "update": 1, "unchanged": 1}
+
+    def test_numeric_and_dates_compare_by_value(self):
+        stored = _stored_metric(revenue=Decimal("200.5"), spend="100.00", roas=2.005)
+
+        assert diff_creative_metrics([_metric()], stored)["unchanged"] == 1
+        assert diff_creative_metrics([_metric(first_date=date(2024, 1, 2))], stored)["update"] == 1
+        assert diff_creative_metrics([_metric(spend=100.01)], stored)["update"] == 1
+
+    def test_null_numeric_differs_from_zero(self):
+        stored = _stored_metric(roas=None)
+
+        assert diff_creative_metrics([_metric(roas=0.0)], stored)["update"] == 1
+        assert diff_creative_metrics([_metric(roas=None)], stored)["unchanged"] == 1
+
+    def test_empty_values_equal_null(self):
+        dimension = _dimensions()[0]
+        dimension["hook"] = ""
+        dimension["parse_errors"] = []
+        now = "2024-01-01T00:00:00+00:00"
+        stored_row = supabase_client._dimension_record(dimension, now)
+        stored_row.update({"hook": None, "parse_errors": None})
+        stored = {(dimension["ad_name_raw"],): stored_row}
+
+        assert diff_dimensions([dimension], stored)["unchanged"] == 1
+
+        stored_row["hook"] = "H1"
+        assert diff_dimensions([dimension], stored)["update"] == 1
+
+    def test_duplicate_metric_key_counts_once(self):
+        metrics = [_metric(spend=1.0), _metric(spend=100.0)]
+
+        assert diff_creative_metrics(metrics, _stored_metric()) == {"insert": 0, "update": 0, "unchanged": 1}